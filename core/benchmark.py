@@ -0,0 +1,363 @@
+"""Micro-benchmarks for the core service.
+
+Usage: python benchmark.py [checks] [lookup] [intents] [fuzzy] [load] [channels]
+
+"checks" asserts behaviour that has regressed before and runs first by default.
+"""
+import asyncio
+import contextlib
+import io
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from concurrent import futures
+from pathlib import Path
+
+import grpc
+import numpy as np
+import yaml
+
+import generated.core_pb2 as core_pb2
+import generated.core_pb2_grpc as core_pb2_grpc
+from generated import spotify_pb2, spotify_pb2_grpc
+from channels import ChannelManager
+from fuzzy import KeywordCorrector, edit_distance
+from intents import INTENTS_PATH, load_intents
+from registry import CommandRegistry, RemoteCall, registry
+from service import AsyncCoreService, CoreService, create_async_server, create_server
+
+
+def _synthetic_registry(size: int, fuzzy: KeywordCorrector = None) -> CommandRegistry:
+    """Registry with `size` commands, each needing two unique keyword groups."""
+    bench_registry = CommandRegistry(fuzzy=fuzzy)
+    for i in range(size):
+        bench_registry.register([[f"verb{i}", f"alias{i}"], f"object{i}"], f"Synthetic command {i}")(
+            lambda args: "ok"
+        )
+    # Real commands at the end, so a linear scan would have to walk past all the synthetic ones
+    bench_registry.register(["play", "music"], "Play a song", extract_args=True)(lambda args: "ok")
+    bench_registry.register([["stop", "pause"], ["music", "song"]], "Stop playback")(lambda args: "ok")
+    return bench_registry
+
+
+def bench_lookup(sizes=(10, 100, 1_000, 10_000), repeat: int = 5, number: int = 2_000):
+    utterances = [
+        "play music bohemian rhapsody".split(),
+        "pause the song please".split(),
+        "what is the weather like".split(),
+    ]
+
+    print(f"{'commands':>10} | {'us/lookup':>10}")
+    for size in sizes:
+        bench_registry = _synthetic_registry(size)
+
+        def lookup():
+            for words in utterances:
+                bench_registry.find_command(words)
+
+        best = min(timeit.repeat(lookup, repeat=repeat, number=number))
+        print(f"{size:>10} | {best / (number * len(utterances)) * 1e6:>10.2f}")
+
+
+def _synthetic_intents(extra: int) -> bytes:
+    """intents.yaml with `extra` synthetic intents appended after the real ones."""
+    intents = yaml.safe_load(INTENTS_PATH.read_bytes())
+    for i in range(extra):
+        intents[f"synthetic_{i}"] = {
+            "description": f"Synthetic intent {i}",
+            "keywords": {"intent": [f"verb{i}", f"alias{i}"], "object": [f"object{i}"]},
+            "params": {"name": "*"},
+        }
+    return yaml.safe_dump(intents).encode()
+
+
+def bench_intents(sizes=(0, 1_000, 10_000), number: int = 2_000):
+    utterances = [
+        "play some song bohemian rhapsody".split(),
+        "turn the lights blue".split(),
+        "what is the weather like".split(),
+    ]
+
+    print(f"{'extra':>8} | {'compile ms':>10} | {'cached ms':>10} | {'us/match':>10}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "intents.yaml"
+            path.write_bytes(_synthetic_intents(size))
+
+            start = time.perf_counter()
+            load_intents(path, cache_dir=Path(tmp))
+            compile_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            matcher = load_intents(path, cache_dir=Path(tmp))
+            cached_ms = (time.perf_counter() - start) * 1000
+
+        def match():
+            for words in utterances:
+                matcher.match(words)
+
+        best = min(timeit.repeat(match, repeat=5, number=number))
+        print(f"{size:>8} | {compile_ms:>10.1f} | {cached_ms:>10.1f} | "
+              f"{best / (number * len(utterances)) * 1e6:>10.2f}")
+
+
+def bench_fuzzy(sizes=(10, 1_000, 10_000), number: int = 100):
+    utterances = [
+        "shuffel the music".split(),
+        "play play lists chill".split(),
+        "paus the song please".split(),
+    ]
+
+    print(f"{'commands':>10} | {'exact us':>10} | {'fuzzy us':>10} | {'brute-force us':>14}")
+    for size in sizes:
+        exact_registry = _synthetic_registry(size)
+        fuzzy_registry = _synthetic_registry(size, fuzzy=KeywordCorrector())
+        corrector = fuzzy_registry.fuzzy
+        fuzzy_registry.resolve([])  # builds the trigram index
+
+        def exact():
+            for words in utterances:
+                exact_registry.resolve(words)
+
+        def fuzzy():
+            for words in utterances:
+                fuzzy_registry.resolve(words)
+
+        def brute_force():
+            # Same corrections, comparing every word with every keyword
+            for words in utterances:
+                for word in words:
+                    if word not in corrector.vocabulary:
+                        limit = corrector.threshold(word)
+                        min((edit_distance(word, keyword, limit), keyword) for keyword in corrector.vocabulary)
+
+        timings = [min(timeit.repeat(run, repeat=3, number=number)) / (number * len(utterances)) * 1e6
+                   for run in (exact, fuzzy, brute_force)]
+        print(f"{size:>10} | {timings[0]:>10.2f} | {timings[1]:>10.2f} | {timings[2]:>14.2f}")
+
+
+class _SlowSpotify(spotify_pb2_grpc.SpotifyServiceServicer):
+    """Stand-in spotify service whose PlaySong takes as long as a real search + playback."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def PlaySong(self, request, context):
+        time.sleep(self.delay)
+        return spotify_pb2.SpotifyResponse(response=f"Playing '{request.name}'", success=True)
+
+
+def _start_spotify(delay: float, port: int = 0, workers: int = 4):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers))
+    spotify_pb2_grpc.add_SpotifyServiceServicer_to_server(_SlowSpotify(delay), server)
+    port = server.add_insecure_port(f"localhost:{port}")
+    server.start()
+    return server, port
+
+
+def _run_clients(port: int, clients: int, requests_per_client: int):
+    """Each client alternates a slow spotify command and a cheap one; returns latencies per kind."""
+    latencies = {"spotify": [], "hello": []}
+    lock = threading.Lock()
+
+    def client():
+        with grpc.insecure_channel(f"localhost:{port}") as channel:
+            stub = core_pb2_grpc.CoreServiceStub(channel)
+            for i in range(requests_per_client):
+                kind, message = ("spotify", "bench play slow song") if i % 2 == 0 else ("hello", "hello")
+                start = time.perf_counter()
+                stub.ProcessMessage(core_pb2.MessageRequest(message=message, source="benchmark"))
+                with lock:
+                    latencies[kind].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def bench_load(clients: int = 16, requests_per_client: int = 10, delay: float = 0.25):
+    spotify_server, spotify_port = _start_spotify(delay, workers=clients)
+
+    bench_channels = ChannelManager()
+    bench_channels.register("bench", f"localhost:{spotify_port}", spotify_pb2_grpc.SpotifyServiceStub)
+
+    registry.register(["bench", "slow"], "Benchmark slow downstream call", extract_args=True)(
+        RemoteCall(bench_channels, "bench", "PlaySong", lambda args: spotify_pb2.SongRequest(name=" ".join(args)))
+    )
+
+    results = {}
+    # The service logs every command to stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = create_server("0")
+        port = server.add_insecure_port("localhost:0")
+        server.start()
+        results["sync"] = _run_clients(port, clients, requests_per_client)
+        server.stop(0)
+
+        loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+        loop_thread.start()
+
+        async def start_async():
+            async_server = create_async_server("0")
+            async_port = async_server.add_insecure_port("localhost:0")
+            await async_server.start()
+            return async_server, async_port
+
+        async def stop_async():
+            await async_server.stop(0)
+            await bench_channels.close_async()
+
+        async_server, port = asyncio.run_coroutine_threadsafe(start_async(), loop).result()
+        results["async"] = _run_clients(port, clients, requests_per_client)
+        asyncio.run_coroutine_threadsafe(stop_async(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        loop_thread.join()
+        loop.close()
+
+    spotify_server.stop(0)
+    bench_channels.close()
+
+    print(f"{clients} clients x {requests_per_client} requests, downstream delay {delay * 1000:.0f} ms")
+    print(f"{'mode':>6} | {'kind':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    for mode, latencies in results.items():
+        for kind, values in latencies.items():
+            p50, p99 = np.percentile(np.array(values) * 1000, [50, 99])
+            print(f"{mode:>6} | {kind:>8} | {p50:>8.1f} | {p99:>8.1f}")
+
+
+def _time_until_success(stub, deadline: float = 30.0) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < deadline:
+        try:
+            stub.PlaySong(spotify_pb2.SongRequest(name="bench"), timeout=1.0)
+            return time.perf_counter() - start
+        except grpc.RpcError:
+            time.sleep(0.05)
+    return float("inf")
+
+
+def bench_channels(downtime: float = 3.0):
+    """Cold first-call latency and recovery after a downstream restart, bare channel vs ChannelManager."""
+    server, port = _start_spotify(delay=0.0)
+    target = f"localhost:{port}"
+
+    bare_channel = grpc.insecure_channel(target)
+    bare = spotify_pb2_grpc.SpotifyServiceStub(bare_channel)
+
+    managed_channels = ChannelManager()
+    managed_channels.register("spotify", target, spotify_pb2_grpc.SpotifyServiceStub)
+    managed_channels.warm().join()
+    managed = managed_channels.stub("spotify")
+
+    print(f"{'channel':>8} | {'first call ms':>13} | {'recovery ms':>11}")
+    first_call = {"bare": _time_until_success(bare), "managed": _time_until_success(managed)}
+
+    # Calls keep failing while the downstream is away, which is what drives reconnect backoff up
+    server.stop(0)
+    stopped = time.perf_counter()
+    while time.perf_counter() - stopped < downtime:
+        for stub in (bare, managed):
+            try:
+                stub.PlaySong(spotify_pb2.SongRequest(name="bench"), timeout=0.2)
+            except grpc.RpcError:
+                pass
+        time.sleep(0.2)
+
+    server, _ = _start_spotify(delay=0.0, port=port)
+    recovery = {"bare": _time_until_success(bare), "managed": _time_until_success(managed)}
+
+    for name in ("bare", "managed"):
+        print(f"{name:>8} | {first_call[name] * 1000:>13.1f} | {recovery[name] * 1000:>11.1f}")
+
+    bare_channel.close()
+    managed_channels.close()
+    server.stop(0)
+
+
+def check_resolve():
+    """Control words inside a song name must not take over the play command, and between two
+    full matches the more specific keyword wins."""
+    expected = {
+        "play music the next episode": "Play a song on spotify",
+        "play music stop this train": "Play a song on spotify",
+        "play music skip to my lou": "Play a song on spotify",
+        "play music shuffle": "Play a song on spotify",
+        "play playlist chill music": "Play a playlist on spotify",
+        "next song": "Skip playback on spotify",
+        "stop the music": "Stop playback on spotify",
+    }
+    for utterance, description in expected.items():
+        command, _ = registry.find_command(utterance.split())
+        assert command.description == description, f"{utterance!r} resolved to {command.description!r}"
+
+    _, args = registry.find_command("play music the next episode".split())
+    assert args == ["the", "next", "episode"], args
+
+
+class _RecordingDownstream:
+    """Handler standing in for a downstream RemoteCall; earlier calls take longer, so running
+    them concurrently finishes them out of order."""
+
+    service = "batch-check"
+
+    def __init__(self, log: list, name: str, delay: float):
+        self.log = log
+        self.name = name
+        self.delay = delay
+
+    def __call__(self, args):
+        time.sleep(self.delay)
+        self.log.append(self.name)
+        return self.name
+
+    async def call_async(self, args):
+        await asyncio.sleep(self.delay)
+        self.log.append(self.name)
+        return self.name
+
+
+def check_batch_order():
+    """Side-effecting commands for one downstream run in request order within a batch."""
+    log = []
+    for name, delay in (("first", 0.05), ("second", 0.0)):
+        registry.register(["batchcheck", name], f"Batch check {name}")(_RecordingDownstream(log, name, delay))
+
+    request = core_pb2.BatchMessageRequest(messages=[
+        core_pb2.MessageRequest(message=f"batchcheck {name}", source="benchmark") for name in ("first", "second")
+    ])
+    with contextlib.redirect_stdout(io.StringIO()):
+        for mode, process in (("sync", CoreService().ProcessMessages),
+                              ("async", lambda *a: asyncio.run(AsyncCoreService().ProcessMessages(*a)))):
+            log.clear()
+            response = process(request, None)
+            assert log == ["first", "second"], f"{mode} batch ran {log}"
+            assert [r.response for r in response.responses] == ["first", "second"], response
+
+
+def run_checks():
+    for check in (check_resolve, check_batch_order):
+        check()
+        print(f"{check.__name__}: ok")
+
+
+BENCHMARKS = {
+    "checks": run_checks,
+    "lookup": bench_lookup,
+    "intents": bench_intents,
+    "fuzzy": bench_fuzzy,
+    "load": bench_load,
+    "channels": bench_channels,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 16 * 1024 * 1024
+
+
+def retry_service_config(methods: Sequence[str]) -> str:
+    """Service config retrying the given "package.Service/Method" calls while the downstream is
+    (re)starting. Only for read-only methods: an UNAVAILABLE call may still have run."""
+    names = []
+    for method in methods:
+        service, name = method.split("/")
+        names.append({"service": service, "method": name})
+
+    return json.dumps({
+        "methodConfig": [{
+            "name": names,
+            "retryPolicy": {
+                "maxAttempts": 4,
+                "initialBackoff": "0.2s",
+                "maxBackoff": "2s",
+                "backoffMultiplier": 2,
+                "retryableStatusCodes": ["UNAVAILABLE"],
+            },
+        }]
+    })
+
+
+CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 60_000),
+    ('grpc.keepalive_timeout_ms', 10_000),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.max_send_message_length', MAX_MESSAGE_LENGTH),
+    ('grpc.max_receive_message_length', MAX_MESSAGE_LENGTH),
+    # Reconnect within seconds of a downstream restart rather than backing off for minutes
+    ('grpc.initial_reconnect_backoff_ms', 200),
+    ('grpc.min_reconnect_backoff_ms', 200),
+    ('grpc.max_reconnect_backoff_ms', 2_000),
+    ('grpc.enable_retries', 1),
+    # Channels of a pool would otherwise share a single connection
+    ('grpc.use_local_subchannel_pool', 1),
+]
+
+
+@dataclass
+class Downstream:
+    name: str
+    target: str
+    stub_class: Callable
+    pool_size: int = 2
+    # Idempotent methods retried on UNAVAILABLE, as "package.Service/Method"
+    retry_methods: Tuple[str, ...] = ()
+
+
+class ChannelManager:
+    """Lazily created pools of channels to the downstream services.
+
+    Every downstream gets up to pool_size channels, handed out round-robin. Sync channels
+    are shared by all threads; asyncio channels are created on first use inside the
+    running event loop.
+    """
+
+    def __init__(self, options: List[Tuple[str, object]] = None):
+        self.options = CHANNEL_OPTIONS if options is None else options
+        self.services: Dict[str, Downstream] = {}
+        self._pools: Dict[str, List[Tuple[grpc.Channel, object]]] = {}
+        self._aio_pools: Dict[str, List[Tuple[grpc.aio.Channel, object]]] = {}
+        self._counters: Dict[str, itertools.count] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, target: str, stub_class: Callable, pool_size: int = 2,
+                 retry_methods: Sequence[str] = ()):
+        self.services[name] = Downstream(name, target, stub_class, pool_size, tuple(retry_methods))
+        self._counters[name] = itertools.count()
+
+    def _options(self, downstream: Downstream) -> List[Tuple[str, object]]:
+        if not downstream.retry_methods:
+            return self.options
+        return self.options + [('grpc.service_config', retry_service_config(downstream.retry_methods))]
+
+    def _pool(self, name: str):
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    downstream = self.services[name]
+                    pool = []
+                    for _ in range(downstream.pool_size):
+                        channel = grpc.insecure_channel(downstream.target, options=self._options(downstream))
+                        pool.append((channel, downstream.stub_class(channel)))
+                    self._pools[name] = pool
+                    logger.info(f"Opened {len(pool)} channels to {name} at {downstream.target}")
+        return pool
+
+    def _aio_pool(self, name: str):
+        # Only touched from the event loop thread, no locking needed
+        pool = self._aio_pools.get(name)
+        if pool is None:
+            downstream = self.services[name]
+            pool = []
+            for _ in range(downstream.pool_size):
+                channel = grpc.aio.insecure_channel(downstream.target, options=self._options(downstream))
+                pool.append((channel, downstream.stub_class(channel)))
+            self._aio_pools[name] = pool
+            logger.info(f"Opened {len(pool)} asyncio channels to {name} at {downstream.target}")
+        return pool
+
+    def stub(self, name: str):
+        pool = self._pool(name)
+        return pool[next(self._counters[name]) % len(pool)][1]
+
+    def aio_stub(self, name: str):
+        pool = self._aio_pool(name)
+        return pool[next(self._counters[name]) % len(pool)][1]
+
+    def warm(self, timeout: float = 30.0) -> threading.Thread:
+        """Connect every sync channel in the background so the first command skips the handshake."""
+
+        def connect():
+            for name in self.services:
+                for channel, _ in self._pool(name):
+                    try:
+                        grpc.channel_ready_future(channel).result(timeout=timeout)
+                    except grpc.FutureTimeoutError:
+                        logger.warning(f"{name} not reachable after {timeout}s, connecting on first use")
+                        break
+                else:
+                    logger.info(f"Channels to {name} ready")
+
+        thread = threading.Thread(target=connect, name="channel-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    async def warm_async(self, timeout: float = 30.0):
+        """asyncio counterpart of warm, meant to run as a task on the server's event loop."""
+        for name in self.services:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(channel.channel_ready() for channel, _ in self._aio_pool(name))),
+                    timeout=timeout,
+                )
+                logger.info(f"Channels to {name} ready")
+            except asyncio.TimeoutError:
+                logger.warning(f"{name} not reachable after {timeout}s, connecting on first use")
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                for channel, _ in pool:
+                    channel.close()
+            self._pools.clear()
+
+    async def close_async(self):
+        for pool in self._aio_pools.values():
+            for channel, _ in pool:
+                await channel.close()
+        self._aio_pools.clear()
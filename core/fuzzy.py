@@ -0,0 +1,106 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, giving up with limit + 1 once it is exceeded.
+
+    Adjacent transpositions count as one edit, so "shuffel" is one edit away from "shuffle".
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class KeywordCorrector:
+    """Maps near-miss transcript words onto registered keywords.
+
+    A character-trigram index is built once over the keyword vocabulary, so each word
+    is only compared with the few keywords sharing most trigrams with it.
+    """
+
+    def __init__(self, max_distance: int = 1, long_word_distance: int = 2, long_word_length: int = 8,
+                 min_length: int = 4, max_candidates: int = 5):
+        # Words shorter than min_length are never corrected, "hi" is not a typo of "his"
+        self.max_distance = max_distance
+        self.long_word_distance = long_word_distance
+        self.long_word_length = long_word_length
+        self.min_length = min_length
+        self.max_candidates = max_candidates
+        self.vocabulary: Set[str] = set()
+        self._index: Dict[str, List[str]] = defaultdict(list)
+
+    def build(self, keywords: Iterable[str]):
+        self.vocabulary = set(keywords)
+        self._index = defaultdict(list)
+        for keyword in self.vocabulary:
+            for gram in trigrams(keyword):
+                self._index[gram].append(keyword)
+
+    def threshold(self, word: str) -> int:
+        if len(word) < self.min_length:
+            return 0
+        if len(word) >= self.long_word_length:
+            return self.long_word_distance
+        return self.max_distance
+
+    def correct(self, word: str) -> Optional[str]:
+        """Closest keyword within the edit-distance threshold for `word`, if any."""
+        if word in self.vocabulary:
+            return word
+
+        limit = self.threshold(word)
+        if not limit:
+            return None
+
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in trigrams(word):
+            for keyword in self._index.get(gram, ()):
+                shared[keyword] += 1
+
+        best, best_distance = None, limit + 1
+        for keyword in sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]:
+            distance = edit_distance(word, keyword, limit)
+            if distance < best_distance:
+                best, best_distance = keyword, distance
+        return best
+
+    def corrections(self, words: List[str]) -> Dict[str, Set[str]]:
+        """Keywords recovered from the words that are not keywords themselves.
+
+        Returns keyword -> transcript words it stands for. Adjacent words are also tried
+        joined together, as the transcriber tends to split words ("play lists").
+        """
+        found: Dict[str, Set[str]] = defaultdict(set)
+
+        for word in words:
+            if word not in self.vocabulary:
+                keyword = self.correct(word)
+                if keyword:
+                    found[keyword].add(word)
+
+        for first, second in zip(words, words[1:]):
+            keyword = self.correct(first + second)
+            # A join that only lands back on one of its halves ("slow x" -> "slow") adds nothing
+            if keyword and keyword not in (first, second):
+                found[keyword].update((first, second))
+
+        return found
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ncore.proto\x12\x04\x63ore\"D\n\x0eMessageRequest\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\"K\n\x0fMessageResponse\x12\x10\n\x08response\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x15\n\rerror_message\x18\x03 \x01(\t\" \n\rHealthRequest\x12\x0f\n\x07service\x18\x01 \x01(\t\"1\n\x0eHealthResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t2\x86\x01\n\x0b\x43oreService\x12=\n\x0eProcessMessage\x12\x14.core.MessageRequest\x1a\x15.core.MessageResponse\x12\x38\n\x0bHealthCheck\x12\x13.core.HealthRequest\x1a\x14.core.HealthResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\ncore.proto\x12\x04\x63ore\"D\n\x0eMessageRequest\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0e\n\x06source\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\"K\n\x0fMessageResponse\x12\x10\n\x08response\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x15\n\rerror_message\x18\x03 \x01(\t\"\xdf\x01\n\x0cMessageEvent\x12%\n\x04type\x18\x01 \x01(\x0e\x32\x17.core.MessageEvent.Type\x12\x0e\n\x06intent\x18\x02 \x01(\t\x12\x17\n\x0f\x61\x63knowledgement\x18\x03 \x01(\t\x12\x0f\n\x07message\x18\x04 \x01(\t\x12\x0f\n\x07\x65lapsed\x18\x05 \x01(\x02\x12\'\n\x08response\x18\x06 \x01(\x0b\x32\x15.core.MessageResponse\"4\n\x04Type\x12\x13\n\x0fINTENT_RESOLVED\x10\x00\x12\x0c\n\x08PROGRESS\x10\x01\x12\t\n\x05\x46INAL\x10\x02\"=\n\x13\x42\x61tchMessageRequest\x12&\n\x08messages\x18\x01 \x03(\x0b\x32\x14.core.MessageRequest\"@\n\x14\x42\x61tchMessageResponse\x12(\n\tresponses\x18\x01 \x03(\x0b\x32\x15.core.MessageResponse\" \n\rHealthRequest\x12\x0f\n\x07service\x18\x01 \x01(\t\"1\n\x0eHealthResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t2\x94\x02\n\x0b\x43oreService\x12=\n\x0eProcessMessage\x12\x14.core.MessageRequest\x1a\x15.core.MessageResponse\x12\x42\n\x14ProcessMessageStream\x12\x14.core.MessageRequest\x1a\x12.core.MessageEvent0\x01\x12H\n\x0fProcessMessages\x12\x19.core.BatchMessageRequest\x1a\x1a.core.BatchMessageResponse\x12\x38\n\x0bHealthCheck\x12\x13.core.HealthRequest\x1a\x14.core.HealthResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,10 +35,18 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_MESSAGEREQUEST']._serialized_end=88
   _globals['_MESSAGERESPONSE']._serialized_start=90
   _globals['_MESSAGERESPONSE']._serialized_end=165
-  _globals['_HEALTHREQUEST']._serialized_start=167
-  _globals['_HEALTHREQUEST']._serialized_end=199
-  _globals['_HEALTHRESPONSE']._serialized_start=201
-  _globals['_HEALTHRESPONSE']._serialized_end=250
-  _globals['_CORESERVICE']._serialized_start=253
-  _globals['_CORESERVICE']._serialized_end=387
+  _globals['_MESSAGEEVENT']._serialized_start=168
+  _globals['_MESSAGEEVENT']._serialized_end=391
+  _globals['_MESSAGEEVENT_TYPE']._serialized_start=339
+  _globals['_MESSAGEEVENT_TYPE']._serialized_end=391
+  _globals['_BATCHMESSAGEREQUEST']._serialized_start=393
+  _globals['_BATCHMESSAGEREQUEST']._serialized_end=454
+  _globals['_BATCHMESSAGERESPONSE']._serialized_start=456
+  _globals['_BATCHMESSAGERESPONSE']._serialized_end=520
+  _globals['_HEALTHREQUEST']._serialized_start=522
+  _globals['_HEALTHREQUEST']._serialized_end=554
+  _globals['_HEALTHRESPONSE']._serialized_start=556
+  _globals['_HEALTHRESPONSE']._serialized_end=605
+  _globals['_CORESERVICE']._serialized_start=608
+  _globals['_CORESERVICE']._serialized_end=884
 # @@protoc_insertion_point(module_scope)
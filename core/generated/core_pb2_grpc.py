@@ -39,6 +39,16 @@ class CoreServiceStub(object):
                 request_serializer=core__pb2.MessageRequest.SerializeToString,
                 response_deserializer=core__pb2.MessageResponse.FromString,
                 _registered_method=True)
+        self.ProcessMessageStream = channel.unary_stream(
+                '/core.CoreService/ProcessMessageStream',
+                request_serializer=core__pb2.MessageRequest.SerializeToString,
+                response_deserializer=core__pb2.MessageEvent.FromString,
+                _registered_method=True)
+        self.ProcessMessages = channel.unary_unary(
+                '/core.CoreService/ProcessMessages',
+                request_serializer=core__pb2.BatchMessageRequest.SerializeToString,
+                response_deserializer=core__pb2.BatchMessageResponse.FromString,
+                _registered_method=True)
         self.HealthCheck = channel.unary_unary(
                 '/core.CoreService/HealthCheck',
                 request_serializer=core__pb2.HealthRequest.SerializeToString,
@@ -56,6 +66,20 @@ class CoreServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ProcessMessageStream(self, request, context):
+        """Same as ProcessMessage, emitting events while the command runs
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ProcessMessages(self, request, context):
+        """Process several messages at once, responses come back in request order
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def HealthCheck(self, request, context):
         """Health check for the service
         """
@@ -71,6 +95,16 @@ def add_CoreServiceServicer_to_server(servicer, server):
                     request_deserializer=core__pb2.MessageRequest.FromString,
                     response_serializer=core__pb2.MessageResponse.SerializeToString,
             ),
+            'ProcessMessageStream': grpc.unary_stream_rpc_method_handler(
+                    servicer.ProcessMessageStream,
+                    request_deserializer=core__pb2.MessageRequest.FromString,
+                    response_serializer=core__pb2.MessageEvent.SerializeToString,
+            ),
+            'ProcessMessages': grpc.unary_unary_rpc_method_handler(
+                    servicer.ProcessMessages,
+                    request_deserializer=core__pb2.BatchMessageRequest.FromString,
+                    response_serializer=core__pb2.BatchMessageResponse.SerializeToString,
+            ),
             'HealthCheck': grpc.unary_unary_rpc_method_handler(
                     servicer.HealthCheck,
                     request_deserializer=core__pb2.HealthRequest.FromString,
@@ -114,6 +148,60 @@ class CoreService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ProcessMessageStream(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/core.CoreService/ProcessMessageStream',
+            core__pb2.MessageRequest.SerializeToString,
+            core__pb2.MessageEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ProcessMessages(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/core.CoreService/ProcessMessages',
+            core__pb2.BatchMessageRequest.SerializeToString,
+            core__pb2.BatchMessageResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def HealthCheck(request,
             target,
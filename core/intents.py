@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import os
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+INTENTS_PATH = Path(os.getenv('INTENTS_PATH', Path(__file__).parent / "Resources" / "intents.yaml"))
+CACHE_DIR = Path(os.getenv('INTENTS_CACHE_DIR', Path(__file__).parent / "Resources" / ".cache"))
+
+# Bump whenever the compiled layout changes so stale caches are ignored
+FORMAT_VERSION = 1
+
+WILDCARD = "*"
+
+
+@dataclass
+class IntentMatch:
+    name: str
+    description: str
+    params: Dict[str, str]
+    services: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class _Slot:
+    name: str
+    # Token ids accepted by the slot, None for a wildcard
+    values: Optional[FrozenSet[int]]
+
+
+@dataclass
+class _Intent:
+    name: str
+    description: str
+    services: List[Dict[str, str]]
+    # One bit per keyword group; the intent matches once every bit is hit
+    required: int
+    slots: List[_Slot]
+    # All keyword tokens, excluded from wildcard slots
+    keywords: FrozenSet[int]
+
+
+class IntentMatcher:
+    """Compiled form of intents.yaml.
+
+    Tokens are interned to integer ids, and each id keeps a posting list of
+    (intent, keyword group bit) pairs. Matching ORs the group bits hit by the
+    utterance per intent and compares them with the intent's required bitset, so
+    only intents sharing a token with the utterance are touched, whatever the size
+    of the file.
+    """
+
+    def __init__(self):
+        self.tokens: Dict[str, int] = {}
+        self.intents: List[_Intent] = []
+        self._postings: List[List[Tuple[int, int]]] = []
+
+    def _intern(self, token: str) -> int:
+        token = str(token).lower()
+        token_id = self.tokens.get(token)
+        if token_id is None:
+            token_id = self.tokens[token] = len(self.tokens)
+            self._postings.append([])
+        return token_id
+
+    def _group(self, position: int, bit: int, values) -> FrozenSet[int]:
+        if isinstance(values, str):
+            values = [values]
+        token_ids = frozenset(self._intern(value) for value in values)
+        for token_id in token_ids:
+            self._postings[token_id].append((position, bit))
+        return token_ids
+
+    def add(self, name: str, spec: dict):
+        position = len(self.intents)
+        keywords = dict(spec.get('keywords') or {})
+
+        # Params may sit next to the keyword groups or at the top level of the intent
+        params = dict(keywords.pop('params', None) or {})
+        params.update(spec.get('params') or {})
+
+        keyword_ids = set()
+        for group, alternatives in enumerate(keywords.values()):
+            keyword_ids |= self._group(position, 1 << group, alternatives)
+        groups = len(keywords)
+
+        slots = []
+        for slot_name, rule in params.items():
+            if rule == WILDCARD:
+                slots.append(_Slot(slot_name, None))
+            else:
+                # A closed set of values also has to be present for the intent to match
+                slots.append(_Slot(slot_name, self._group(position, 1 << groups, rule)))
+                groups += 1
+
+        self.intents.append(_Intent(
+            name=name,
+            description=spec.get('description', name),
+            services=list(spec.get('services') or []),
+            required=(1 << groups) - 1,
+            slots=slots,
+            keywords=frozenset(keyword_ids),
+        ))
+
+    def match(self, words: List[str]) -> Optional[IntentMatch]:
+        token_ids = [self.tokens.get(word.lower()) for word in words]
+
+        hits: Dict[int, int] = {}
+        for token_id in set(token_ids):
+            if token_id is not None:
+                for position, bit in self._postings[token_id]:
+                    hits[position] = hits.get(position, 0) | bit
+
+        # The lowest position wins, which keeps the file order as priority
+        matched = [position for position, bits in hits.items() if bits == self.intents[position].required]
+        if not matched:
+            return None
+
+        intent = self.intents[min(matched)]
+        return IntentMatch(
+            name=intent.name,
+            description=intent.description,
+            params=self._extract(intent, words, token_ids),
+            services=intent.services,
+        )
+
+    @staticmethod
+    def _extract(intent: _Intent, words: List[str], token_ids: List[Optional[int]]) -> Dict[str, str]:
+        params = {}
+        consumed = set(intent.keywords)
+
+        for slot in intent.slots:
+            if slot.values is None:
+                continue
+            for word, token_id in zip(words, token_ids):
+                if token_id in slot.values:
+                    params[slot.name] = word.lower()
+                    consumed.add(token_id)
+                    break
+
+        for slot in intent.slots:
+            if slot.values is None:
+                params[slot.name] = " ".join(
+                    word for word, token_id in zip(words, token_ids) if token_id not in consumed
+                )
+        return params
+
+    def __len__(self):
+        return len(self.intents)
+
+
+def compile_intents(source: bytes) -> IntentMatcher:
+    matcher = IntentMatcher()
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    for name, spec in (yaml.load(source, Loader=loader) or {}).items():
+        matcher.add(name, spec or {})
+    return matcher
+
+
+def _cache_path(digest: str, cache_dir: Path) -> Path:
+    return cache_dir / f"intents-v{FORMAT_VERSION}-{digest[:16]}.pickle"
+
+
+def load_intents(path: Path = INTENTS_PATH, cache_dir: Path = CACHE_DIR) -> IntentMatcher:
+    """Load the compiled matcher for `path`, compiling and caching it on the first run."""
+    source = Path(path).read_bytes()
+    digest = hashlib.sha256(source).hexdigest()
+    cache_file = _cache_path(digest, Path(cache_dir))
+
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'rb') as f:
+                matcher = pickle.load(f)
+            logger.info(f"Loaded {len(matcher)} compiled intents from {cache_file}")
+            return matcher
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable intent cache {cache_file}: {e}")
+
+    matcher = compile_intents(source)
+    logger.info(f"Compiled {len(matcher)} intents from {path}")
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        for stale in cache_file.parent.glob("intents-*.pickle"):
+            stale.unlink()
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(matcher, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_file.replace(cache_file)
+    except OSError as e:
+        logger.warning(f"Could not write intent cache {cache_file}: {e}")
+
+    return matcher
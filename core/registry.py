@@ -1,11 +1,20 @@
 # jarvis/commands/registry.py
+import asyncio
+import heapq
+import inspect
+import math
 import os
+import time
 
-import grpc
-from dataclasses import dataclass
-from typing import List, Union, Callable, Optional
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Set, Tuple, Union, Callable, Optional
 import sys
 
+from cache import ResponseCache
+from channels import ChannelManager
+from fuzzy import KeywordCorrector
+
 
 """
 import smart_home_pb2
@@ -29,7 +38,13 @@ import google_gemini_pb2_grpc
 
 from generated import spotify_pb2, spotify_pb2_grpc
 
-spotify = spotify_pb2_grpc.SpotifyServiceStub(grpc.insecure_channel("spotify-service:50052"))
+# Downstream channels are opened on first use (or by channels.warm() at startup)
+channels = ChannelManager()
+# Only read-only calls are retried, a PlaySong or Next that failed as UNAVAILABLE may already have run
+channels.register("spotify", os.getenv('SPOTIFY_ADDRESS', "spotify-service:50052"),
+                  spotify_pb2_grpc.SpotifyServiceStub, pool_size=int(os.getenv('SPOTIFY_CHANNELS', 2)),
+                  retry_methods=["spotify.SpotifyService/GetNowPlaying", "spotify.SpotifyService/GetState",
+                                 "spotify.SpotifyService/HealthCheck"])
 
 
 """smart_home = smart_home_pb2_grpc.SmartHomeStub(grpc.insecure_channel("smart_home:50051"))
@@ -42,97 +57,399 @@ camera = camera_pb2_grpc.CameraStub(grpc.insecure_channel("camera:50051"))
 google_gemini = google_gemini_pb2_grpc.GoogleGeminiStub(grpc.insecure_channel("google_gemini:50051"))
 """
 
+class RemoteCall:
+    """Handler forwarding to a downstream gRPC method, usable from both server modes.
+
+    Called directly it blocks on the sync stub; call_async awaits the asyncio stub so the
+    event loop keeps serving other clients while the downstream call is in flight.
+    """
+
+    def __init__(self, channels: ChannelManager, service: str, method: str, build_request: Callable):
+        self.channels = channels
+        self.service = service
+        self.method = method
+        self.build_request = build_request
+
+    def __call__(self, args):
+        return getattr(self.channels.stub(self.service), self.method)(self.build_request(args))
+
+    async def call_async(self, args):
+        return await getattr(self.channels.aio_stub(self.service), self.method)(self.build_request(args))
+
+
+def spotify_call(method: str, build_request: Callable) -> RemoteCall:
+    return RemoteCall(channels, "spotify", method, build_request)
+
+
 @dataclass
 class Command:
     keywords: List[Union[str, List[str]]]
     handler: Callable
     description: str
     extract_args: bool = False
+    # Seconds a handler output may be reused for the same args, None if not cacheable
+    cache_ttl: Optional[float] = None
+    # Said by streaming clients while the handler runs, e.g. "Playing..."
+    acknowledgement: str = ""
+
+
+@dataclass
+class CommandResult:
+    """Normalized outcome of a handler, whatever it returned."""
+    response: str
+    success: bool = True
+    error_message: str = ""
+    # Time spent in the handler; 0 when served from the cache
+    elapsed_ms: float = 0.0
+    cached: bool = False
+
+    @classmethod
+    def from_output(cls, output, elapsed_ms: float = 0.0) -> "CommandResult":
+        if isinstance(output, CommandResult):
+            return replace(output, elapsed_ms=elapsed_ms)
+        if isinstance(output, str):
+            return cls(output, elapsed_ms=elapsed_ms)
+        if hasattr(output, 'response'):
+            # Downstream responses (SpotifyResponse, ...) share the response/success/error_message layout
+            return cls(
+                response=output.response,
+                success=getattr(output, 'success', True),
+                error_message=getattr(output, 'error_message', ""),
+                elapsed_ms=elapsed_ms,
+            )
+        return cls(str(output), elapsed_ms=elapsed_ms)
+
+
+@dataclass
+class CommandMatch:
+    command: Command
+    args: List[str]
+    # Fraction of the command's keyword groups found in the utterance
+    confidence: float
+
+
+@dataclass
+class Resolution:
+    # Best candidates first, at most top_k of them
+    candidates: List[CommandMatch]
+    min_confidence: float = 1.0
+
+    @property
+    def best(self) -> Optional[CommandMatch]:
+        if self.candidates and self.candidates[0].confidence >= self.min_confidence:
+            return self.candidates[0]
+        return None
+
+    @property
+    def low_confidence(self) -> List[CommandMatch]:
+        """Candidates that share keywords with the utterance but are not sure enough to run."""
+        return [match for match in self.candidates if match.confidence < self.min_confidence]
+
+    @property
+    def is_miss(self) -> bool:
+        return not self.candidates
 
 
 class CommandRegistry:
-    def __init__(self):
+    def __init__(self, fuzzy: Optional[KeywordCorrector] = None):
         self.commands: List[Command] = []
+        # Optional typo-tolerant matching of transcript words onto keywords
+        self.fuzzy = fuzzy
+        # Outputs of side-effect free commands registered with a cache_ttl
+        self.cache = ResponseCache()
+        # Inverted index: token -> ids of the keyword groups containing it
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        # Owning command of every keyword group
+        self._group_command: List[int] = []
+        # Number of keyword groups each command needs to match
+        self._required: List[int] = []
+        # NumPy form of the above, rebuilt lazily after registrations
+        self._coverage_index = None
+        # Commands bound to the intents compiled from intents.yaml, keyed by intent name
+        self.intent_commands: Dict[str, Command] = {}
+
+    def register(self, keywords: List[Union[str, List[str]]], description: str, extract_args: bool = False,
+                 cache_ttl: Optional[float] = None, acknowledgement: str = ""):
+        def decorator(handler: Callable):
+            self._add(Command(keywords, handler, description, extract_args, cache_ttl, acknowledgement))
+            return handler
+        return decorator
 
-    def register(self, keywords: List[Union[str, List[str]]], description: str, extract_args: bool = False):
+    def intent(self, name: str, description: str = "", acknowledgement: str = ""):
         def decorator(handler: Callable):
-            self.commands.append(Command(keywords, handler, description, extract_args))
+            self.intent_commands[name] = Command([], handler, description or name, acknowledgement=acknowledgement)
             return handler
         return decorator
 
-    def find_command(self, words: List[str]) -> Optional[tuple[Command, List[str]]]:
+    def _add(self, command: Command):
+        position = len(self.commands)
+        self.commands.append(command)
+        self._required.append(len(command.keywords))
+
+        for keyword in command.keywords:
+            group = len(self._group_command)
+            self._group_command.append(position)
+            alternatives = keyword if isinstance(keyword, list) else [keyword]
+            for alt in set(alternatives):
+                self._index[alt].append(group)
+
+        self._coverage_index = None
+        self.cache.clear()
+
+    def _build_coverage_index(self):
+        # Keywords shared by fewer commands say more about which one was meant ("playlist" vs "music")
+        token_weight = {
+            token: math.log((1 + len(self.commands)) / len({self._group_command[g] for g in groups})) + 1
+            for token, groups in self._index.items()
+        }
+        # Commands without keywords match every utterance
+        unconditional = [position for position, required in enumerate(self._required) if required == 0]
+        if self.fuzzy:
+            self.fuzzy.build(self._index)
+        self._coverage_index = token_weight, unconditional
+        return self._coverage_index
+
+    def resolve(self, words: List[str], top_k: int = 3, min_confidence: float = 1.0) -> Resolution:
+        """Score the commands sharing a keyword with the utterance and return the top_k.
+
+        Only the keyword groups reached through the token index are visited, so a lookup
+        costs the same however many commands are registered. Candidates rank by coverage,
+        then by how many groups they matched, then by where their keywords sit (the leftmost,
+        tightest span wins, so "play music the next episode" plays rather than skips), then
+        by how rare the matched keywords are ("playlist" over "music"), and only then by
+        registration order.
+        """
+        token_weight, unconditional = self._coverage_index or self._build_coverage_index()
         lower_words = [w.lower() for w in words]
-        for command in self.commands:
-            matches = True
-            for keyword in command.keywords:
-                if isinstance(keyword, list):
-                    if not any(alt in lower_words for alt in keyword):
-                        matches = False
-                        break
-                else:
-                    if keyword not in lower_words:
-                        matches = False
-                        break
-            if matches:
-                if command.extract_args:
-                    used_words = set()
-                    for keyword in command.keywords:
-                        if isinstance(keyword, list):
-                            for alt in keyword:
-                                if alt in lower_words:
-                                    used_words.add(alt)
-                                    break
-                        else:
-                            used_words.add(keyword)
-                    args = [word for word in words if word.lower() not in used_words]
-                    return command, args
-                return command, []
+
+        # Keyword -> transcript words it was recovered from by fuzzy matching
+        aliases = self.fuzzy.corrections(lower_words) if self.fuzzy else {}
+
+        first_seen: Dict[str, int] = {}
+        for i, word in enumerate(lower_words):
+            first_seen.setdefault(word, i)
+
+        # Group -> (weight, position); a group hit through several alternatives counts once,
+        # with its rarest keyword at its leftmost word
+        group_hits: Dict[int, Tuple[float, int]] = {}
+        for token in set(lower_words).union(aliases):
+            groups = self._index.get(token)
+            if not groups:
+                continue
+            weight = token_weight[token]
+            # A recovered keyword sits where the words it was recovered from do
+            where = first_seen[token] if token in first_seen else min(first_seen[word] for word in aliases[token])
+            for group in groups:
+                hit = group_hits.get(group)
+                group_hits[group] = (weight, where) if hit is None else (max(hit[0], weight), min(hit[1], where))
+
+        # Command -> [groups matched, summed keyword weight, span start, span end]
+        scores: Dict[int, List] = {}
+        for group, (weight, where) in group_hits.items():
+            position = self._group_command[group]
+            score = scores.get(position)
+            if score is None:
+                scores[position] = [1, weight, where, where]
+            else:
+                score[0] += 1
+                score[1] += weight
+                score[2] = min(score[2], where)
+                score[3] = max(score[3], where)
+        for position in unconditional:
+            scores[position] = [0, 0.0, len(lower_words), len(lower_words)]
+
+        def coverage(position):
+            required = self._required[position]
+            return scores[position][0] / required if required else 1.0
+
+        def rank(position):
+            matched, specificity, start, end = scores[position]
+            return -coverage(position), -matched, start, end, -specificity, position
+
+        return Resolution(
+            candidates=[
+                CommandMatch(
+                    command=self.commands[position],
+                    args=self._extract_args(self.commands[position], words, lower_words, aliases),
+                    confidence=coverage(position),
+                )
+                for position in heapq.nsmallest(top_k, scores, key=rank)
+            ],
+            min_confidence=min_confidence,
+        )
+
+    @staticmethod
+    def command_key(command: Command, args):
+        """Identifies a command run: the same key means the same handler with equivalent args."""
+        if isinstance(args, dict):
+            args = sorted(args.items())
+        return id(command), tuple(str(arg).strip().lower() for arg in args)
+
+    def _cached(self, command: Command, args):
+        """(cache key, cached result) for cacheable commands, (None, None) otherwise."""
+        if command.cache_ttl is None:
+            return None, None
+
+        key = self.command_key(command, args)
+        found, result = self.cache.get(key)
+        return key, (replace(result, elapsed_ms=0.0, cached=True) if found else None)
+
+    def _store(self, command: Command, key, result: CommandResult):
+        # Failures are not worth replaying
+        if key is not None and result.success:
+            self.cache.put(key, result, command.cache_ttl)
+
+    def execute(self, command: Command, args) -> CommandResult:
+        """Run the command's handler, reusing a cached result for cacheable commands."""
+        key, result = self._cached(command, args)
+        if result:
+            return result
+
+        start = time.perf_counter()
+        output = self._call(command.handler, args)
+        result = CommandResult.from_output(output, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+        self._store(command, key, result)
+        return result
+
+    async def execute_async(self, command: Command, args) -> CommandResult:
+        """Same as execute, awaiting async handlers and moving blocking ones off the event loop."""
+        key, result = self._cached(command, args)
+        if result:
+            return result
+
+        start = time.perf_counter()
+        output = await self._call_async(command.handler, args)
+        result = CommandResult.from_output(output, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+        self._store(command, key, result)
+        return result
+
+    @staticmethod
+    def _call(handler: Callable, args):
+        if inspect.iscoroutinefunction(handler):
+            return asyncio.run(handler(args))
+        return handler(args)
+
+    @staticmethod
+    async def _call_async(handler: Callable, args):
+        if hasattr(handler, 'call_async'):
+            return await handler.call_async(args)
+        if inspect.iscoroutinefunction(handler):
+            return await handler(args)
+        return await asyncio.to_thread(handler, args)
+
+    def resolve_many(self, utterances: List[List[str]], top_k: int = 3,
+                     min_confidence: float = 1.0) -> List[Resolution]:
+        """Resolve a batch of utterances, scoring each distinct utterance only once."""
+        resolved: Dict[tuple, Resolution] = {}
+        for words in utterances:
+            key = tuple(w.lower() for w in words)
+            if key not in resolved:
+                resolved[key] = self.resolve(words, top_k, min_confidence)
+        return [resolved[tuple(w.lower() for w in words)] for words in utterances]
+
+    def find_command(self, words: List[str]) -> Optional[tuple[Command, List[str]]]:
+        best = self.resolve(words, top_k=1).best
+        if best:
+            return best.command, best.args
         return None
 
+    @staticmethod
+    def _extract_args(command: Command, words: List[str], lower_words: List[str],
+                      aliases: Dict[str, Set[str]]) -> List[str]:
+        if not command.extract_args:
+            return []
+
+        used_words = set()
+        for keyword in command.keywords:
+            if isinstance(keyword, list):
+                for alt in keyword:
+                    if alt in lower_words or alt in aliases:
+                        used_words.add(alt)
+                        break
+            else:
+                used_words.add(keyword)
+
+        # Transcript words that were corrected into a used keyword are not arguments either
+        for keyword in list(used_words):
+            used_words.update(aliases.get(keyword, ()))
+        return [word for word in words if word.lower() not in used_words]
+
 
 # Global registry
-registry = CommandRegistry()
+registry = CommandRegistry(fuzzy=KeywordCorrector(
+    max_distance=int(os.getenv('FUZZY_MAX_DISTANCE', 1)),
+    long_word_distance=int(os.getenv('FUZZY_LONG_WORD_DISTANCE', 2)),
+    min_length=int(os.getenv('FUZZY_MIN_LENGTH', 4)),
+))
 
 def set_mood_handler(args):
     return "Hello!"
 
-registry.register([["hello", "hi"]], "Hello world!")(set_mood_handler)
+registry.register([["hello", "hi"]], "Hello world!", cache_ttl=3600)(set_mood_handler)
 
+registry.register([["list", "lists", "tell"], ["commands", "command"]], "List commands", cache_ttl=3600)(
+    lambda args: "\n".join([f"- {' '.join(map(str, cmd.keywords))}: {cmd.description}" for cmd in registry.commands])
+)
 
-registry.register(["play", "music"], "Play a song on spotify", extract_args=True)(
-    lambda args: spotify.PlaySong(spotify_pb2.SongRequest(name=" ".join(args)))
+
+registry.register(["play", "music"], "Play a song on spotify", extract_args=True,
+                  acknowledgement="Playing...")(
+    spotify_call("PlaySong", lambda args: spotify_pb2.SongRequest(name=" ".join(args)))
 )
 
-registry.register(["play", "playlist"], "Play a playlist on spotify", extract_args=True)(
-    lambda args: spotify.PlayPlaylist(spotify_pb2.PlaylistRequest(name=" ".join(args)))
+registry.register(["play", "playlist"], "Play a playlist on spotify", extract_args=True,
+                  acknowledgement="Playing your playlist...")(
+    spotify_call("PlayPlaylist", lambda args: spotify_pb2.PlaylistRequest(name=" ".join(args)))
 )
 
-registry.register([["stop", "pause"], ["music", "song"]], "Stop playback on spotify", extract_args=True)(
-    lambda args: spotify.Stop(spotify_pb2.Empty())
+registry.register([["stop", "pause"], ["music", "song"]], "Stop playback on spotify", extract_args=True,
+                  acknowledgement="Pausing...")(
+    spotify_call("Stop", lambda args: spotify_pb2.Empty())
 )
 
-registry.register([["next", "skip"], ["music", "song"]], "Skip playback on spotify", extract_args=True)(
-    lambda args: spotify.Next(spotify_pb2.Empty())
+registry.register([["next", "skip"], ["music", "song"]], "Skip playback on spotify", extract_args=True,
+                  acknowledgement="Skipping...")(
+    spotify_call("Next", lambda args: spotify_pb2.Empty())
 )
 
-registry.register([["continue", "unpause", "resume"], ["music", "song"]], "Resume playback on spotify", extract_args=True)(
-    lambda args: spotify.Unpause(spotify_pb2.Empty())
+registry.register([["continue", "unpause", "resume"], ["music", "song"]], "Resume playback on spotify", extract_args=True,
+                  acknowledgement="Resuming...")(
+    spotify_call("Unpause", lambda args: spotify_pb2.Empty())
 )
-registry.register([["shuffle", "change"], ["music", "song"]], "Toggle shuffle on spotify", extract_args=True)(
-    lambda args: spotify.ToggleShuffle(spotify_pb2.Empty())
+registry.register([["shuffle", "change"], ["music", "song"]], "Toggle shuffle on spotify", extract_args=True,
+                  acknowledgement="Shuffling...")(
+    spotify_call("ToggleShuffle", lambda args: spotify_pb2.Empty())
+)
+
+
+registry.register([["volume", "sound"], ["high", "max"]], "Set maximum volume on spotify", extract_args=True,
+                  acknowledgement="Turning it up...")(
+    spotify_call("SetVolume", lambda args: spotify_pb2.VolumeRequest(level=90))
 )
 
+registry.register([["volume", "sound"], ["medium", "normal"]], "Set normal volume on spotify", extract_args=True,
+                  acknowledgement="Setting the volume...")(
+    spotify_call("SetVolume", lambda args: spotify_pb2.VolumeRequest(level=60))
+)
+
+registry.register([["volume", "sound"], "low"], "Set low volume on spotify", extract_args=True,
+                  acknowledgement="Turning it down...")(
+    spotify_call("SetVolume", lambda args: spotify_pb2.VolumeRequest(level=30))
+)
 
-registry.register([["volume", "sound"], ["high", "max"]], "Set maximum volume on spotify", extract_args=True)(
-    lambda args: spotify.SetVolume(spotify_pb2.VolumeRequest(level=90))
+# === intents.yaml ===
+registry.intent("play_song", "Play a song", acknowledgement="Playing...")(
+    spotify_call("PlaySong", lambda params: spotify_pb2.SongRequest(name=params["name"]))
 )
 
-registry.register([["volume", "sound"], ["medium", "normal"]], "Set normal volume on spotify", extract_args=True)(
-    lambda args: spotify.SetVolume(spotify_pb2.VolumeRequest(level=60))
+registry.intent("play_playlist", "Play a playlist", acknowledgement="Playing your playlist...")(
+    spotify_call("PlayPlaylist", lambda params: spotify_pb2.PlaylistRequest(name=params["name"]))
 )
 
-registry.register([["volume", "sound"], "low"], "Set low volume on spotify", extract_args=True)(
-    lambda args: spotify.SetVolume(spotify_pb2.VolumeRequest(level=30))
+registry.intent("stop_music", "Stop/pause music", acknowledgement="Pausing...")(
+    spotify_call("Stop", lambda params: spotify_pb2.Empty())
 )
 """
 # === Binance ===
@@ -229,10 +546,6 @@ registry.register(["conversation"], "Chatting with Jarvis", extract_args=True)(
     lambda args: jarvis_core.Chat(jarvis_core_pb2.ChatRequest(message=" ".join(args)))
 )
 
-registry.register([["list", "lists", "tell"], ["commands", "command"]], "List commands")(
-    lambda args: "\n".join([f"- {' '.join(map(str, cmd.keywords))}: {cmd.description}" for cmd in registry.commands])
-)
-
 # === News ===
 registry.register(["news"], "Popular news")(
     lambda args: news.SendNews(news_pb2.Empty())
@@ -5,89 +5,259 @@ import time
 import logging
 from concurrent import futures
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # Import generated protobuf files
 import generated.core_pb2 as core_pb2
 import generated.core_pb2_grpc as core_pb2_grpc
-from registry import registry
+from registry import Command, CommandResult, Resolution, channels, registry
+from intents import load_intents
+
+# Seconds between PROGRESS events while a streamed command is still running
+PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', 1.0))
 
 
 class CoreService(core_pb2_grpc.CoreServiceServicer):
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self.intents = load_intents()
+        # Runs handlers for ProcessMessageStream and ProcessMessages off the RPC thread
+        self._executor = futures.ThreadPoolExecutor(max_workers=8)
         self.logger.info("Core service initialized")
 
     def ProcessMessage(self, request, context):
 
         try:
 
-            raw_response = self.find_run_intent(request.message)
+            result = self.find_run_intent(request.message)
+            return self._build_response(result)
+
+        except Exception as e:
+            return self._error_response(e)
+
+    def ProcessMessageStream(self, request, context):
+
+        start = time.monotonic()
+
+        try:
+
+            intent = self.find_intent(request.message)
+            if isinstance(intent, str):
+                yield self._final_event(self._build_response(CommandResult(intent)), start)
+                return
+
+            command, args = intent
+            yield self._resolved_event(command, start)
+
+            future = self._executor.submit(registry.execute, command, args)
+            while True:
+                try:
+                    result = future.result(timeout=PROGRESS_INTERVAL)
+                    break
+                except futures.TimeoutError:
+                    yield self._progress_event(command, start)
+
+            yield self._final_event(self._build_response(result), start)
 
-            if hasattr(raw_response, 'response'):
-                response_message = raw_response.response
-                self.logger.info(f"Extracted response field: '{response_message}'")
-            elif isinstance(raw_response, str):
+        except Exception as e:
+            yield self._final_event(self._error_response(e), start)
+
+    def ProcessMessages(self, request, context):
+
+        plan, jobs, lanes = self._plan_batch(request.messages)
+        outcomes: List[Any] = [None] * len(jobs)
+        # Drain the iterator so every lane has finished before responding
+        list(self._executor.map(lambda lane: self._run_lane(jobs, lane, outcomes), lanes))
+        return self._batch_response(plan, outcomes)
+
+    @staticmethod
+    def _run_lane(jobs: List[Tuple[Command, Any]], lane: List[int], outcomes: List[Any]):
+        """Run a lane's jobs in order, storing each result or exception at its job index."""
+        for i in lane:
+            command, args = jobs[i]
+            try:
+                outcomes[i] = registry.execute(command, args)
+            except Exception as e:
+                outcomes[i] = e
+
+    @staticmethod
+    def _downstream(command: Command) -> Optional[str]:
+        """Downstream service a command forwards to, None for handlers that run in-process."""
+        return getattr(command.handler, 'service', None)
+
+    def _plan_batch(self, messages) -> Tuple[List[Union[int, str]], List[Tuple[Command, Any]], List[List[int]]]:
+        """Resolve a whole batch and dedupe it.
 
-                if raw_response.startswith('response: '):
+        Returns one entry per message, either a direct reply or the index of its job, the
+        (command, args) jobs to run, and the lanes to run them in. Only side-effect free
+        commands (those with a cache_ttl) are shared between messages, three "next song"
+        still skip three times. Side-effecting jobs for the same downstream share a lane and
+        run one after the other in request order, so "pause music" then "resume music" ends
+        up playing; lanes run concurrently.
+        """
+        word_lists = [message.message.lower().split() for message in messages]
+        resolutions = registry.resolve_many(word_lists)
 
-                    import re
-                    match = re.search(r'response: "(.*?)"', raw_response)
-                    if match:
-                        response_message = match.group(1)
-                    else:
-                        response_message = raw_response
+        plan, jobs, job_index = [], [], {}
+        lanes: List[List[int]] = []
+        downstream_lanes: Dict[str, List[int]] = {}
+        for words, resolution in zip(word_lists, resolutions):
+            intent = self._intent_from(words, resolution)
+            if isinstance(intent, str):
+                plan.append(intent)
+                continue
+
+            command, args = intent
+            if command.cache_ttl is None:
+                plan.append(len(jobs))
+                downstream = self._downstream(command)
+                if downstream is None:
+                    lanes.append([len(jobs)])
                 else:
-                    response_message = raw_response
+                    if downstream not in downstream_lanes:
+                        downstream_lanes[downstream] = []
+                        lanes.append(downstream_lanes[downstream])
+                    downstream_lanes[downstream].append(len(jobs))
+                jobs.append(intent)
+                continue
+
+            key = registry.command_key(command, args)
+            if key not in job_index:
+                job_index[key] = len(jobs)
+                lanes.append([len(jobs)])
+                jobs.append(intent)
+            plan.append(job_index[key])
+
+        self.logger.info(f"Batch of {len(plan)} messages, {len(jobs)} commands to run in {len(lanes)} lanes")
+        return plan, jobs, lanes
+
+    def _batch_response(self, plan: List[Union[int, str]], outcomes: List[Any]):
+        responses = []
+        for step in plan:
+            outcome = CommandResult(step) if isinstance(step, str) else outcomes[step]
+            if isinstance(outcome, Exception):
+                responses.append(self._error_response(outcome))
             else:
-                response_message = str(raw_response)
+                responses.append(self._build_response(outcome))
+        return core_pb2.BatchMessageResponse(responses=responses)
 
-            # Create response
-            response = core_pb2.MessageResponse(
-                response=response_message,
-                success=True,
-                error_message=""
-            )
+    @staticmethod
+    def _resolved_event(command: Command, start: float):
+        return core_pb2.MessageEvent(
+            type=core_pb2.MessageEvent.INTENT_RESOLVED,
+            intent=command.description,
+            acknowledgement=command.acknowledgement,
+            elapsed=time.monotonic() - start
+        )
 
-            self.logger.info(f"Responding with response '{response_message}'")
-            return response
+    @staticmethod
+    def _progress_event(command: Command, start: float):
+        return core_pb2.MessageEvent(
+            type=core_pb2.MessageEvent.PROGRESS,
+            intent=command.description,
+            message=f"Still working on: {command.description}",
+            elapsed=time.monotonic() - start
+        )
 
-        except Exception as e:
-            self.logger.error(f"Error processing message: {str(e)}")
+    @staticmethod
+    def _final_event(response, start: float):
+        return core_pb2.MessageEvent(
+            type=core_pb2.MessageEvent.FINAL,
+            response=response,
+            elapsed=time.monotonic() - start
+        )
 
-            # Return error response
-            return core_pb2.MessageResponse(
-                response="Sorry, I encountered an error processing your message.",
-                success=False,
-                error_message=str(e)
-            )
+    def _build_response(self, result: CommandResult):
+
+        response = core_pb2.MessageResponse(
+            response=result.response,
+            success=result.success,
+            error_message=result.error_message
+        )
+
+        source = "cache" if result.cached else f"{result.elapsed_ms:.1f} ms"
+        self.logger.info(f"Responding with response '{result.response}' ({source})")
+        return response
+
+    def _error_response(self, e: Exception):
+        self.logger.error(f"Error processing message: {str(e)}")
+
+        # Return error response
+        return core_pb2.MessageResponse(
+            response="Sorry, I encountered an error processing your message.",
+            success=False,
+            error_message=str(e)
+        )
 
-    def find_run_intent(self, command_string: str) -> str:
+    def find_intent(self, command_string: str) -> Union[Tuple[Command, Any], str]:
+        """Resolve a message to the command to run and its args, or to a direct reply."""
 
         words = command_string.lower().split()
+        return self._intent_from(words, registry.resolve(words))
 
-        result = registry.find_command(words)
+    def _intent_from(self, words: List[str], resolution: Resolution) -> Union[Tuple[Command, Any], str]:
 
         print(f"Found command: {words}")
 
-        if result:
-            command, args = result
-
-            output = command.handler(args)
+        if resolution.best:
+            command, args = resolution.best.command, resolution.best.args
 
             print("Intent:", " ".join(map(str, command.keywords)))
             print("Params:", args)
-            print("Output:", output)
 
-            return output
-        else:
-            print("No matching command found")
-            return "No matching command found"
+            return command, args
+
+        match = self.intents.match(words)
+        if match:
+            print("Intent:", match.name)
+            print("Params:", match.params)
+
+            command = registry.intent_commands.get(match.name)
+            if not command:
+                return f"{match.description} is not available yet"
+
+            return command, match.params
+
+        if resolution.low_confidence:
+            suggestion = resolution.low_confidence[0]
+            print(f"Low confidence match: {suggestion.command.description} ({suggestion.confidence:.2f})")
+            return f"Did you mean: {suggestion.command.description}?"
+
+        print("No matching command found")
+        return "No matching command found"
+
+    def find_run_intent(self, command_string: str) -> CommandResult:
+
+        intent = self.find_intent(command_string)
+        if isinstance(intent, str):
+            return CommandResult(intent)
+
+        command, args = intent
+        result = registry.execute(command, args)
+        print("Output:", result.response)
+
+        return result
+
+    async def find_run_intent_async(self, command_string: str) -> CommandResult:
+
+        intent = self.find_intent(command_string)
+        if isinstance(intent, str):
+            return CommandResult(intent)
+
+        command, args = intent
+        result = await registry.execute_async(command, args)
+        print("Output:", result.response)
+
+        return result
 
     def HealthCheck(self, request, context):
         try:
+            stats = registry.cache.stats()
             return core_pb2.HealthResponse(
                 status="healthy",
-                message="Core service is running normally"
+                message=f"Core service is running normally "
+                        f"(response cache: {stats['entries']} entries, {stats['hits']} hits, "
+                        f"{stats['misses']} misses, {stats['hit_rate']:.0%} hit rate)"
             )
         except Exception as e:
             return core_pb2.HealthResponse(
@@ -95,9 +265,68 @@ class CoreService(core_pb2_grpc.CoreServiceServicer):
                 message=f"Error: {str(e)}"
             )
 
-def serve():
+class AsyncCoreService(CoreService):
+    """CoreService for the grpc.aio server: downstream calls are awaited on the event loop,
+    so a slow Spotify call no longer holds a worker thread other clients are waiting for."""
 
-    port = os.getenv('GRPC_PORT', '50051')
+    async def ProcessMessage(self, request, context):
+
+        try:
+
+            result = await self.find_run_intent_async(request.message)
+            return self._build_response(result)
+
+        except Exception as e:
+            return self._error_response(e)
+
+    async def ProcessMessageStream(self, request, context):
+
+        start = time.monotonic()
+
+        try:
+
+            intent = self.find_intent(request.message)
+            if isinstance(intent, str):
+                yield self._final_event(self._build_response(CommandResult(intent)), start)
+                return
+
+            command, args = intent
+            yield self._resolved_event(command, start)
+
+            task = asyncio.ensure_future(registry.execute_async(command, args))
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=PROGRESS_INTERVAL)
+                if done:
+                    result = task.result()
+                    break
+                yield self._progress_event(command, start)
+
+            yield self._final_event(self._build_response(result), start)
+
+        except Exception as e:
+            yield self._final_event(self._error_response(e), start)
+
+    async def ProcessMessages(self, request, context):
+
+        plan, jobs, lanes = self._plan_batch(request.messages)
+        outcomes: List[Any] = [None] * len(jobs)
+        await asyncio.gather(*(self._run_lane_async(jobs, lane, outcomes) for lane in lanes))
+        return self._batch_response(plan, outcomes)
+
+    @staticmethod
+    async def _run_lane_async(jobs: List[Tuple[Command, Any]], lane: List[int], outcomes: List[Any]):
+        for i in lane:
+            command, args = jobs[i]
+            try:
+                outcomes[i] = await registry.execute_async(command, args)
+            except Exception as e:
+                outcomes[i] = e
+
+    async def HealthCheck(self, request, context):
+        return super().HealthCheck(request, context)
+
+
+def create_server(port: str) -> grpc.Server:
 
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
 
@@ -106,13 +335,58 @@ def serve():
 
     listen_addr = f'[::]:{port}'
     server.add_insecure_port(listen_addr)
+    return server
+
+
+def create_async_server(port: str) -> grpc.aio.Server:
+
+    server = grpc.aio.server()
+
+    core_service = AsyncCoreService()
+    core_pb2_grpc.add_CoreServiceServicer_to_server(core_service, server)
+
+    listen_addr = f'[::]:{port}'
+    server.add_insecure_port(listen_addr)
+    return server
+
+
+def serve():
+
+    port = os.getenv('GRPC_PORT', '50051')
+
+    server = create_server(port)
     server.start()
+    channels.warm()
 
     try:
         server.wait_for_termination()
     except KeyboardInterrupt:
         server.stop(0)
+        channels.close()
+
+
+async def serve_async():
+
+    port = os.getenv('GRPC_PORT', '50051')
+
+    server = create_async_server(port)
+    await server.start()
+    warmup = asyncio.create_task(channels.warm_async())
+
+    try:
+        await server.wait_for_termination()
+    except asyncio.CancelledError:
+        warmup.cancel()
+        await server.stop(0)
+        await channels.close_async()
 
 
 if __name__ == '__main__':
-    serve()
\ No newline at end of file
+    # The asyncio server is the default, CORE_SERVER_MODE=sync falls back to the thread pool one
+    if os.getenv('CORE_SERVER_MODE', 'async') == 'sync':
+        serve()
+    else:
+        try:
+            asyncio.run(serve_async())
+        except KeyboardInterrupt:
+            pass
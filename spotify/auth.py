@@ -0,0 +1,89 @@
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger("spotify-service")
+
+
+class TokenManager:
+    """
+    Keeps the Spotify access token fresh without probing the API.
+    The token is refreshed on a background timer refresh_margin seconds before it
+    expires, and on demand when a call comes back with 401.
+    """
+
+    def __init__(self, oauth, token_file: Path, on_refresh: Callable[[dict], None], refresh_margin: float = 120.0):
+        self.oauth = oauth
+        self.token_file = token_file
+        self.on_refresh = on_refresh
+        self.refresh_margin = refresh_margin
+        self.token_info: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def expires_at(self) -> float:
+        return self.token_info.get('expires_at', 0) if self.token_info else 0
+
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at - self.refresh_margin
+
+    def load(self) -> bool:
+        """Load the token file, refreshing it first if it has expired. Returns False if there are no tokens."""
+        if not self.token_file.exists():
+            return False
+
+        with open(self.token_file, 'r') as f:
+            self.token_info = json.load(f)
+
+        if self.expired():
+            self.refresh()
+        else:
+            self._apply(self.token_info)
+        return True
+
+    def refresh(self):
+        """Refresh the access token now, unless another thread just did."""
+        expires_at = self.expires_at
+        with self._lock:
+            if self.expires_at != expires_at and not self.expired():
+                return
+
+            logger.info("Refreshing Spotify access token...")
+            token_info = self.oauth.refresh_access_token(self.token_info['refresh_token'])
+
+            with open(self.token_file, 'w') as f:
+                json.dump(token_info, f, indent=2)
+
+            self._apply(token_info)
+
+    def _apply(self, token_info: dict):
+        self.token_info = token_info
+        self.on_refresh(token_info)
+        self._schedule()
+
+    def _schedule(self):
+        if self._timer:
+            self._timer.cancel()
+
+        delay = max(self.expires_at - self.refresh_margin - time.time(), 0)
+        self._timer = threading.Timer(delay, self._refresh_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+        logger.info(f"🔑 Access token refresh scheduled in {delay:.0f}s")
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.error("Background token refresh failed, retrying in 30s", exc_info=True)
+            self._timer = threading.Timer(30, self._refresh_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
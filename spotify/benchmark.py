@@ -0,0 +1,190 @@
+"""Micro-benchmarks for the Spotify service.
+
+Usage: python benchmark.py [checks] [matcher] [lookup]
+
+"checks" asserts behaviour that has regressed before and runs first by default.
+"""
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+import timeit
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from controls import net_effect
+from devices import DeviceCache
+from matcher import FuzzyMatcher
+from search_cache import TRACK_FIELDS, SearchCache
+
+try:
+    from fuzzywuzzy import fuzz
+
+    ratio = fuzz.ratio
+    RATIO_NAME = "fuzz.ratio loop"
+except ImportError:
+    def ratio(a, b):
+        return SequenceMatcher(None, a, b).ratio() * 100
+
+    RATIO_NAME = "difflib loop"
+
+WORDS = ("chill", "summer", "road", "trip", "hits", "focus", "lofi", "beats", "party", "workout",
+         "morning", "coffee", "rock", "classics", "jazz", "night", "drive", "indie", "mix", "acoustic")
+
+
+def _names(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [f"{' '.join(rng.sample(WORDS, rng.randint(2, 4)))} {i}" for i in range(size)]
+
+
+def bench_matcher(sizes=(100, 1_000, 10_000), number: int = 20):
+    queries = ["chill summer beats", "road trip hitz", "morning cofee jazz", "something else entirely"]
+
+    print(f"{'candidates':>10} | {'build ms':>9} | {'matcher us/query':>16} | {RATIO_NAME + ' us/query':>24} | agree")
+    for size in sizes:
+        names = _names(size)
+        # The target of each query exists somewhere in the middle of the library
+        names[size // 2] = "Chill Summer Beats"
+        names[size // 3] = "Road Trip Hits"
+
+        start = time.perf_counter()
+        matcher = FuzzyMatcher([(name, name) for name in names])
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def vectorized():
+            return [matcher.extract_one(query) for query in queries]
+
+        def loop():
+            best = []
+            for query in queries:
+                scores = [ratio(query.lower(), name.lower()) for name in names]
+                best.append(names[scores.index(max(scores))])
+            return best
+
+        matcher_us = min(timeit.repeat(vectorized, repeat=3, number=number)) / (number * len(queries)) * 1e6
+        loop_number = max(1, number * 100 // size)
+        loop_us = min(timeit.repeat(loop, repeat=3, number=loop_number)) / (loop_number * len(queries)) * 1e6
+
+        agree = sum(match[0] == best for match, best in zip(vectorized()[:2], loop()[:2]))
+        print(f"{size:>10} | {build_ms:>9.1f} | {matcher_us:>16.1f} | {loop_us:>24.1f} | {agree}/2")
+
+
+def _seeded_cache(size: int):
+    """SearchCache loaded from a file with `size` tracks, the way it comes back after a restart, and the tracks."""
+    names = _names(size)
+    artists = _names(size, seed=1)
+    albums = _names(size, seed=2)
+    names[size // 2], artists[size // 2], albums[size // 2] = "Bohemian Rhapsody", "Queen", "A Night at the Opera"
+
+    expires_at = time.time() + 3600
+    entries = [[f"query {i}", expires_at, {"name": names[i], "artist": artists[i], "album": albums[i],
+                                           "uri": f"spotify:track:{i}"}]
+               for i in range(size)]
+    path = Path(tempfile.mkdtemp()) / "search_cache.json"
+    path.write_text(json.dumps({"entries": entries}))
+    return SearchCache(path, max_entries=size), [track for _, _, track in entries]
+
+
+def bench_lookup(sizes=(128, 512, 2_048), number: int = 50):
+    queries = {"name": "bohemian rapsody", "artist": "queen", "album": "night at the opera"}
+
+    print(f"{'tracks':>8} | {'first us':>9} | {'lookup us':>9} | {RATIO_NAME + ' us':>18} | found")
+    for size in sizes:
+        cache, tracks = _seeded_cache(size)
+
+        # The first lookup per field builds that field's matcher
+        start = time.perf_counter()
+        found = sum(cache.lookup(query, field, min_score=0.5) is not None for field, query in queries.items())
+        first_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        def lookup():
+            for field, query in queries.items():
+                cache.lookup(query, field, min_score=0.5)
+
+        def loop():
+            for field, query in queries.items():
+                max(tracks, key=lambda track: ratio(query, track[field].lower()))
+
+        lookup_us = min(timeit.repeat(lookup, repeat=3, number=number)) / (number * len(queries)) * 1e6
+        loop_us = min(timeit.repeat(loop, repeat=3, number=number)) / (number * len(queries)) * 1e6
+        print(f"{size:>8} | {first_us:>9.1f} | {lookup_us:>9.1f} | {loop_us:>18.1f} | {found}/{len(queries)}")
+
+
+def check_matcher():
+    """Query words the index has never seen must lower the score, not drop out of it."""
+    cached = ["let it be", "hello", "one", "believer", "bohemian rhapsody"]
+    matcher = FuzzyMatcher([(name, name) for name in cached])
+    for query in ("let it be love", "hello goodbye", "one more time", "imagine dragons believer"):
+        match = matcher.extract_one(query, min_score=0.85)
+        assert match is None, f"{query!r} matched {match}"
+    assert matcher.extract_one("Bohemian Rhapsody!") == ("bohemian rhapsody", 1.0)
+    assert matcher.extract_one("bohemian rapsody", min_score=0.5)[0] == "bohemian rhapsody"
+
+    cache = SearchCache(Path(tempfile.mkdtemp()) / "search_cache.json")
+    cache.put("hello", {"name": "Hello", "uri": "spotify:track:hello"})
+    assert cache.get("hello goodbye") is None
+    assert cache.get("Hello!")["uri"] == "spotify:track:hello"
+
+    # Field lookups match cached tracks directly and leave the PlaySong hit rate alone
+    cache, _ = _seeded_cache(64)
+    stats = cache.stats()
+    for field, query in zip(TRACK_FIELDS, ("bohemian rapsody", "Queen", "night at the opera")):
+        assert cache.lookup(query, field, min_score=0.5)["name"] == "Bohemian Rhapsody", (field, query)
+    assert cache.get("bohemian rhapsody") is None
+    assert cache.stats()["hits"] == stats["hits"]
+
+
+def check_controls():
+    """Merged controls keep the last play/pause and the order of the ops they stand for."""
+    def calls(*actions):
+        return [action for action, _, _ in net_effect([(action, None) for action in actions])]
+
+    # From paused playback, pause + play must still resume
+    assert calls("pause", "play") == ["play"]
+    assert calls("play", "pause", "play") == ["play"]
+    assert calls("pause", "next") == ["pause", "next"]
+    assert calls("next", "pause", "next") == ["next", "pause", "next"]
+    assert net_effect([("volume", 30), ("next", None), ("volume", 90)]) == [
+        ("next", None, [1]), ("volume", 90, [0, 2])
+    ]
+
+
+def check_devices():
+    """Callers that find the device list stale share one fetch."""
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0.01)
+        return [{"id": "speaker", "is_active": True}]
+
+    async def run():
+        cache = DeviceCache(fetch)
+        devices = await asyncio.gather(*(cache.active() for _ in range(5)))
+        assert [device["id"] for device in devices] == ["speaker"] * 5
+
+    asyncio.run(run())
+    assert fetches == 1, f"{fetches} fetches for 5 concurrent callers"
+
+
+def run_checks():
+    for check in (check_matcher, check_controls, check_devices):
+        check()
+        print(f"{check.__name__}: ok")
+
+
+BENCHMARKS = {
+    "checks": run_checks,
+    "matcher": bench_matcher,
+    "lookup": bench_lookup,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
@@ -0,0 +1,141 @@
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from spotipy import SpotifyException
+
+from scheduler import RequestScheduler
+
+logger = logging.getLogger("spotify-service")
+
+API_URL = "https://api.spotify.com/v1/"
+
+# Seconds to wait per endpoint group. Lookups should fail fast, playback commands
+# can take a while when Spotify has to wake the device up.
+ENDPOINT_TIMEOUTS = {
+    "search": 3.0,
+    "devices": 2.0,
+    "library": 5.0,
+    "player": 6.0,
+    "user": 3.0,
+}
+
+CONNECT_TIMEOUT = 2.0
+
+
+class AsyncSpotify:
+    """
+    Minimal asyncio client for the Spotify Web API calls this service makes.
+    All requests share one keep-alive connection pool. Method names and arguments follow
+    spotipy, and HTTP errors are raised as spotipy.SpotifyException so callers handle both alike.
+    Requests are sent through the scheduler, which keeps us under Spotify's rate limit.
+    A request rejected with 401 is sent once more after on_unauthorized has refreshed the token.
+    """
+
+    def __init__(self, auth: str, scheduler: Optional[RequestScheduler] = None,
+                 max_connections: int = 10, max_keepalive: int = 5,
+                 on_unauthorized: Optional[Callable[[], Awaitable[None]]] = None):
+        self._auth = auth
+        self.scheduler = scheduler or RequestScheduler()
+        self.on_unauthorized = on_unauthorized
+        self._client = httpx.AsyncClient(
+            base_url=API_URL,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                keepalive_expiry=60.0),
+            timeout=httpx.Timeout(5.0, connect=CONNECT_TIMEOUT),
+        )
+
+    def set_auth(self, auth: str):
+        self._auth = auth
+
+    async def _call(self, method: str, path: str, endpoint: str, params: Optional[Dict[str, Any]] = None,
+                    payload: Optional[Dict[str, Any]] = None, coalesce: Optional[tuple] = None):
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        try:
+            return await self.scheduler.submit(lambda: self._send(method, path, endpoint, params, payload), coalesce)
+        except SpotifyException as e:
+            if e.http_status != 401 or not self.on_unauthorized:
+                raise
+
+        # Spotify did not act on a rejected request, so sending it again is safe
+        await self.on_unauthorized()
+        return await self.scheduler.submit(lambda: self._send(method, path, endpoint, params, payload), coalesce)
+
+    async def _send(self, method: str, path: str, endpoint: str, params: Dict[str, Any],
+                    payload: Optional[Dict[str, Any]]):
+        response = await self._client.request(
+            method, path,
+            params=params,
+            content=json.dumps(payload) if payload is not None else None,
+            headers={"Authorization": f"Bearer {self._auth}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(ENDPOINT_TIMEOUTS[endpoint], connect=CONNECT_TIMEOUT),
+        )
+
+        if response.is_error:
+            try:
+                error = response.json().get("error", {})
+                msg, reason = error.get("message"), error.get("reason")
+            except ValueError:
+                msg, reason = response.text or None, None
+
+            logger.error(f"HTTP Error for {method} to {path} returned {response.status_code} due to {msg}")
+            raise SpotifyException(response.status_code, -1, f"{response.url}:\n {msg}",
+                                   reason=reason, headers=response.headers)
+
+        if not response.content:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    async def current_user(self):
+        return await self._call("GET", "me", "user")
+
+    async def current_user_playlists(self, limit: int = 50, offset: int = 0):
+        return await self._call("GET", "me/playlists", "library", params={"limit": limit, "offset": offset})
+
+    async def search(self, q: str, limit: int = 10, type: str = "track"):
+        return await self._call("GET", "search", "search", params={"q": q, "limit": limit, "type": type})
+
+    async def devices(self):
+        return await self._call("GET", "me/player/devices", "devices")
+
+    async def current_playback(self):
+        """Current player state, None when no device is active"""
+        return await self._call("GET", "me/player", "devices")
+
+    async def start_playback(self, device_id: Optional[str] = None, context_uri: Optional[str] = None,
+                             uris: Optional[List[str]] = None, offset: Optional[dict] = None,
+                             position_ms: Optional[int] = None):
+        payload = {}
+        if context_uri is not None:
+            payload["context_uri"] = context_uri
+        if uris is not None:
+            payload["uris"] = uris
+        if offset is not None:
+            payload["offset"] = offset
+        if position_ms is not None:
+            payload["position_ms"] = position_ms
+        return await self._call("PUT", "me/player/play", "player", params={"device_id": device_id}, payload=payload)
+
+    async def pause_playback(self, device_id: Optional[str] = None):
+        return await self._call("PUT", "me/player/pause", "player", params={"device_id": device_id})
+
+    async def next_track(self, device_id: Optional[str] = None):
+        return await self._call("POST", "me/player/next", "player", params={"device_id": device_id})
+
+    async def shuffle(self, state: bool, device_id: Optional[str] = None):
+        # Only the last of several queued shuffle/volume changes matters
+        return await self._call("PUT", "me/player/shuffle", "player",
+                                params={"state": str(state).lower(), "device_id": device_id},
+                                coalesce=("shuffle", device_id))
+
+    async def volume(self, volume_percent: int, device_id: Optional[str] = None):
+        return await self._call("PUT", "me/player/volume", "player",
+                                params={"volume_percent": volume_percent, "device_id": device_id},
+                                coalesce=("volume", device_id))
+
+    async def close(self):
+        await self._client.aclose()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("spotify-service")
+
+# Actions that set the playback state, as opposed to skipping or adjusting it
+TRANSPORT = ("pause", "play")
+
+Op = Tuple[str, Any]
+
+
+def net_effect(ops: List[Op]) -> List[Tuple[str, Any, List[int]]]:
+    """
+    Calls that have the same effect as running `ops` in order, as (action, value, indices of
+    the ops each call stands for). Calls keep the relative order of the ops they stand for.
+
+    - next: every skip is kept
+    - pause/play: only the last one is sent, where it was queued. Pause followed by play
+      can't be dropped, it would leave paused playback paused
+    - volume/shuffle: the last value wins, sent where it was queued
+    """
+    def kind(action):
+        return "transport" if action in TRANSPORT else action
+
+    last = {kind(action): i for i, (action, _) in enumerate(ops) if action != "next"}
+    # Index of the op sent -> indices of the ops its call stands for
+    covered: Dict[int, List[int]] = defaultdict(list)
+    for i, (action, _) in enumerate(ops):
+        covered[i if action == "next" else last[kind(action)]].append(i)
+
+    return [(ops[i][0], ops[i][1], covered[i]) for i in sorted(covered)]
+
+
+class ControlDebouncer:
+    """
+    Holds playback control commands per device for `window` seconds and then issues only
+    their net effect, e.g. volume 30, 60, 90 becomes a single volume 90 and pause + resume
+    becomes a single resume. Every caller gets the outcome of the call its command was merged into.
+    """
+
+    def __init__(self, send: Callable[[str, str, Any], Awaitable[Any]], window: float = 0.1):
+        self._send = send
+        self.window = window
+        self.received = 0
+        self.issued = 0
+        self._batches: Dict[str, List[Tuple[str, Any, asyncio.Future]]] = {}
+        # Flushes in flight, referenced until done so they are not garbage collected
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, device_id: str, action: str, value: Optional[Any] = None):
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(device_id)
+        if batch is None:
+            batch = self._batches[device_id] = []
+            loop.call_later(self.window, self._start_flush, device_id)
+
+        future = loop.create_future()
+        batch.append((action, value, future))
+        self.received += 1
+        return await future
+
+    def _start_flush(self, device_id: str):
+        task = asyncio.get_running_loop().create_task(self._flush(device_id))
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Control flush failed: {task.exception()}")
+
+    async def _flush(self, device_id: str):
+        batch = self._batches.pop(device_id)
+        plan = net_effect([(action, value) for action, value, _ in batch])
+        if len(batch) > 1:
+            logger.info(f"🎛️ Merged {len(batch)} controls for device {device_id} into {len(plan)} calls")
+
+        covered = set()
+        for action, value, indices in plan:
+            covered.update(indices)
+            try:
+                self.issued += 1
+                result = await self._send(device_id, action, value)
+                outcome = (result, None)
+            except Exception as e:
+                outcome = (None, e)
+
+            for i in indices:
+                future = batch[i][2]
+                if future.done():
+                    continue
+                if outcome[1] is not None:
+                    future.set_exception(outcome[1])
+                else:
+                    future.set_result(outcome[0])
+
+        # Ops that cancelled each other out succeed without a call
+        for i, (_, _, future) in enumerate(batch):
+            if i not in covered and not future.done():
+                future.set_result(None)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger("spotify-service")
+
+# Reasons Spotify gives when playback targets a device that is gone or asleep
+DEVICE_ERROR_REASONS = ("NO_ACTIVE_DEVICE",)
+
+
+def is_device_error(e) -> bool:
+    """True for playback errors caused by a stale or unavailable device."""
+    if getattr(e, 'reason', None) in DEVICE_ERROR_REASONS:
+        return True
+    return getattr(e, 'http_status', None) == 404 and 'device' in str(getattr(e, 'msg', '')).lower()
+
+
+class DeviceCache:
+    """
+    Short-lived cache of the user's Spotify devices.
+    Entries older than refresh_after are served while a background refresh runs,
+    entries older than ttl are refetched before answering.
+    Lives on the server's event loop, so no locking is needed.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[List[dict]]], ttl: float = 30.0, refresh_after: float = 10.0):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+        self._devices: Optional[List[dict]] = None
+        self._fetched_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def _refresh(self):
+        devices = await self._fetch()
+        self._devices = devices
+        self._fetched_at = time.monotonic()
+        return devices
+
+    async def devices(self) -> List[dict]:
+        age = time.monotonic() - self._fetched_at
+
+        if self._devices is None or age > self.ttl:
+            # Every caller waits on the same refresh, shielded so one caller giving up doesn't cancel it for the rest
+            self.refresh_in_background()
+            return await asyncio.shield(self._refreshing)
+
+        if age > self.refresh_after:
+            self.refresh_in_background()
+        return self._devices
+
+    async def active(self) -> Optional[dict]:
+        """
+        Returns the active device dict, or the first device if none are active.
+        Returns None if no devices are found.
+        """
+        try:
+            devices = await self.devices()
+
+            if not devices:
+                logger.warning("No active Spotify devices found")
+                return None
+
+            for device in devices:
+                if device.get('is_active'):
+                    return device
+
+            # No active device, fallback to first one
+            return devices[0]
+
+        except Exception:
+            logger.error("Failed to fetch Spotify devices", exc_info=True)
+            return None
+
+    def invalidate(self):
+        """Drop the cached list, e.g. after playback failed on a device, and refetch it in the background."""
+        self._devices = None
+        self.refresh_in_background()
+
+    def refresh_in_background(self):
+        # At most one refresh in flight
+        if self._refreshing and not self._refreshing.done():
+            return
+
+        self._refreshing = asyncio.get_running_loop().create_task(self._refresh())
+        self._refreshing.add_done_callback(self._refresh_done)
+
+    @staticmethod
+    def _refresh_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.warning("Background device refresh failed", exc_info=task.exception())
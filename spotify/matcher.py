@@ -0,0 +1,97 @@
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def normalize(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace: "Café  Hits!" -> "cafe hits"."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', name.lower()).split())
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = f"${name}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyMatcher(Generic[T]):
+    """
+    Trigram TF-IDF index over a fixed set of candidate names.
+    Candidates are vectorized once at build time into per-trigram posting arrays, so a
+    query is scored against every candidate with a single bincount instead of a Python loop.
+    Scores are cosine similarities in [0, 1].
+    """
+
+    def __init__(self, candidates: Sequence[Tuple[str, T]]):
+        self.values: List[T] = [value for _, value in candidates]
+        self.names: List[str] = [normalize(name) for name, _ in candidates]
+        self._exact: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self._exact.setdefault(name, i)
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, name in enumerate(self.names):
+            for gram in trigrams(name):
+                postings[gram].append(i)
+
+        size = len(self.names)
+        self._idf = {gram: math.log((1 + size) / (1 + len(docs))) + 1 for gram, docs in postings.items()}
+        # Trigrams no candidate has are the rarest of all; they match nothing but still count
+        # in the query norm, so "let it be love" does not score as high as "let it be"
+        self._unseen_idf = math.log(1 + size) + 1
+
+        # Rows are L2-normalized, so a dot product with a normalized query is the cosine
+        norms = np.zeros(size)
+        for gram, docs in postings.items():
+            norms[docs] += self._idf[gram] ** 2
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1.0
+
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for gram, docs in postings.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            self._postings[gram] = (docs, self._idf[gram] / norms[docs])
+
+    def __len__(self):
+        return len(self.values)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query with every candidate."""
+        query_grams = trigrams(normalize(query))
+        grams = [gram for gram in query_grams if gram in self._postings]
+        if not grams:
+            return np.zeros(len(self.values))
+
+        weights = np.array([self._idf[gram] for gram in grams])
+        unseen = len(query_grams) - len(grams)
+        weights /= math.sqrt(np.dot(weights, weights) + unseen * self._unseen_idf ** 2)
+        docs = np.concatenate([self._postings[gram][0] for gram in grams])
+        doc_weights = np.concatenate([self._postings[gram][1] * w for gram, w in zip(grams, weights)])
+        return np.bincount(docs, weights=doc_weights, minlength=len(self.values))
+
+    def extract(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[T, float]]:
+        """Best `limit` candidates scoring at least min_score, best first."""
+        if not self.values:
+            return []
+
+        scores = self.scores(query)
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.values[i], float(scores[i])) for i in top if scores[i] >= min_score and scores[i] > 0]
+
+    def extract_one(self, query: str, min_score: float = 0.0) -> Optional[Tuple[T, float]]:
+        """Best candidate, an exact normalized-name match short-circuits scoring."""
+        exact = self._exact.get(normalize(query))
+        if exact is not None:
+            return self.values[exact], 1.0
+
+        best = self.extract(query, limit=1, min_score=min_score)
+        return best[0] if best else None
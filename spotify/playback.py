@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("spotify-service")
+
+
+@dataclass
+class PlaybackState:
+    is_playing: bool = False
+    track: dict = field(default_factory=dict)
+    progress_ms: int = 0
+    device_id: str = ""
+    device_name: str = ""
+    volume: int = 0
+    shuffle: bool = False
+    # time.monotonic() of the progress reading and of Spotify's last confirmation
+    progress_at: float = 0.0
+    confirmed_at: float = 0.0
+
+    def progress_now(self) -> int:
+        """Progress extrapolated from the last reading, capped at the track length."""
+        progress = self.progress_ms
+        if self.is_playing:
+            progress += int((time.monotonic() - self.progress_at) * 1000)
+        duration = self.track.get('duration_ms')
+        return min(progress, duration) if duration else progress
+
+
+def track_from(item: Optional[dict]) -> dict:
+    if not item:
+        return {}
+    return {
+        'uri': item.get('uri', ''),
+        'name': item.get('name', ''),
+        'artist': (item.get('artists') or [{}])[0].get('name', ''),
+        'album': (item.get('album') or {}).get('name', ''),
+        'duration_ms': item.get('duration_ms', 0),
+    }
+
+
+class PlaybackMirror:
+    """
+    In-memory copy of the player state, so read-side RPCs never call the Web API.
+    Our own commands are applied optimistically, and current_playback is polled to pick up
+    everything else. The poll interval adapts to the state: soon after a command of ours,
+    right after the current track should end, and rarely while nothing is playing.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[Optional[dict]]], active_interval: float = 15.0,
+                 idle_interval: float = 60.0, settle_delay: float = 1.0):
+        self._fetch = fetch
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.settle_delay = settle_delay
+        self.state = PlaybackState()
+        self.polls = 0
+        self._wake: Optional[asyncio.Event] = None
+
+    def update(self, playback: Optional[dict]):
+        """Replace the mirror with a current_playback response (None when nothing is active)."""
+        now = time.monotonic()
+        if not playback:
+            self.state = PlaybackState(volume=self.state.volume, shuffle=self.state.shuffle,
+                                       progress_at=now, confirmed_at=now)
+            return
+
+        device = playback.get('device') or {}
+        self.state = PlaybackState(
+            is_playing=playback.get('is_playing', False),
+            track=track_from(playback.get('item')),
+            progress_ms=playback.get('progress_ms') or 0,
+            device_id=device.get('id') or "",
+            device_name=device.get('name') or "",
+            volume=device.get('volume_percent') or 0,
+            shuffle=playback.get('shuffle_state', False),
+            progress_at=now,
+            confirmed_at=now,
+        )
+
+    def apply(self, action: str, value=None, device: Optional[dict] = None):
+        """Apply one of our own commands once Spotify accepted it, then confirm it with a poll soon."""
+        state = self.state
+        if device:
+            state.device_id, state.device_name = device['id'], device['name']
+
+        if action in ("pause", "play"):
+            state.progress_ms, state.progress_at = state.progress_now(), time.monotonic()
+            state.is_playing = action == "play"
+        elif action == "volume":
+            state.volume = value
+        elif action == "shuffle":
+            state.shuffle = value
+        elif action == "track":
+            state.track = dict(value)
+            state.is_playing, state.progress_ms, state.progress_at = True, 0, time.monotonic()
+        # "next" and "playlist" change the track to one we don't know yet, the poll fills it in
+
+        self.poke()
+
+    def poke(self):
+        """Poll soon, after giving Spotify a moment to settle."""
+        if self._wake:
+            self._wake.set()
+
+    def _next_interval(self) -> float:
+        state = self.state
+        if not state.is_playing:
+            return self.idle_interval
+
+        remaining = (state.track.get('duration_ms', 0) - state.progress_now()) / 1000
+        if 0 < remaining < self.active_interval:
+            # Catch the track change as it happens
+            return remaining + self.settle_delay
+        return self.active_interval
+
+    async def poll(self):
+        self.polls += 1
+        self.update(await self._fetch())
+
+    def start(self) -> asyncio.Task:
+        """Poll with adaptive intervals, as a task on the running event loop."""
+        self._wake = asyncio.Event()
+
+        async def loop():
+            while True:
+                try:
+                    await self.poll()
+                except Exception:
+                    logger.warning("Playback state poll failed", exc_info=True)
+
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._next_interval())
+                    self._wake.clear()
+                    await asyncio.sleep(self.settle_delay)
+                except asyncio.TimeoutError:
+                    pass
+
+        return asyncio.get_running_loop().create_task(loop())
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from matcher import FuzzyMatcher
+
+logger = logging.getLogger("spotify-service")
+
+PAGE_SIZE = 50
+
+
+class PlaylistIndex:
+    """
+    Local copy of the user's playlists, persisted to disk and searched without the network.
+    sync() pages through the whole library and uses snapshot ids to tell which playlists
+    changed; the search structures are rebuilt only when something did.
+    """
+
+    def __init__(self, fetch_page: Callable[[int, int], Awaitable[dict]], path: Path, sync_interval: float = 300.0):
+        self._fetch_page = fetch_page
+        self.path = path
+        self.sync_interval = sync_interval
+        self.playlists: Dict[str, dict] = {}
+        self.synced_at = 0.0
+        self._matcher: FuzzyMatcher[dict] = FuzzyMatcher([])
+        self._syncing = asyncio.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._swap(self._build({p['id']: p for p in data.get('playlists', [])}))
+            logger.info(f"📚 Loaded {len(self.playlists)} playlists from {self.path}")
+        except Exception:
+            logger.warning(f"Could not read playlist index {self.path}, starting empty", exc_info=True)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'playlists': list(self.playlists.values())}, f)
+        tmp.replace(self.path)
+
+    @staticmethod
+    def _build(playlists: Dict[str, dict]):
+        return playlists, FuzzyMatcher([(playlist['name'], playlist) for playlist in playlists.values()])
+
+    def _swap(self, built):
+        # The matcher is built aside and swapped in whole, lookups never see a half-built index
+        self.playlists, self._matcher = built
+
+    async def sync(self) -> bool:
+        """Page through the library and apply changes. Returns True if anything changed."""
+        async with self._syncing:
+            start = time.monotonic()
+            fetched, offset = {}, 0
+            while True:
+                page = await self._fetch_page(PAGE_SIZE, offset)
+                for item in page.get('items', []):
+                    if item:
+                        fetched[item['id']] = {
+                            'id': item['id'],
+                            'name': item['name'],
+                            'uri': item['uri'],
+                            'snapshot_id': item.get('snapshot_id'),
+                            'tracks_total': (item.get('tracks') or {}).get('total', 0),
+                        }
+                if not page.get('next'):
+                    break
+                offset += PAGE_SIZE
+
+            current = self.playlists
+            added = fetched.keys() - current.keys()
+            removed = current.keys() - fetched.keys()
+            changed = [i for i in fetched.keys() & current.keys()
+                       if fetched[i]['snapshot_id'] != current[i].get('snapshot_id') or fetched[i]['name'] != current[i]['name']]
+
+            self.synced_at = time.monotonic()
+            elapsed_ms = (self.synced_at - start) * 1000
+            if not (added or removed or changed):
+                logger.info(f"📚 Playlist index up to date ({len(fetched)} playlists, {elapsed_ms:.0f} ms)")
+                return False
+
+            # Building the matcher for a large library takes a while, keep it off the event loop
+            self._swap(await asyncio.to_thread(self._build, fetched))
+            await asyncio.to_thread(self._save)
+            logger.info(f"📚 Playlist index synced in {elapsed_ms:.0f} ms: "
+                        f"{len(added)} added, {len(changed)} changed, {len(removed)} removed")
+            return True
+
+    def start(self) -> asyncio.Task:
+        """Sync now and every sync_interval seconds, as a task on the running event loop."""
+
+        async def loop():
+            while True:
+                try:
+                    await self.sync()
+                except Exception:
+                    logger.warning("Playlist sync failed", exc_info=True)
+                await asyncio.sleep(self.sync_interval)
+
+        return asyncio.get_running_loop().create_task(loop())
+
+    def search(self, query: str, min_score: float = 0.3) -> Optional[dict]:
+        """Best playlist for a spoken name: exact normalized match first, then trigram TF-IDF similarity."""
+        match = self._matcher.extract_one(query, min_score=min_score)
+        return match[0] if match else None
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from spotipy import SpotifyException
+
+logger = logging.getLogger("spotify-service")
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `burst`.
+    Lives on the event loop, so no locking is needed."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds`, e.g. after Spotify asked us to back off."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        # One token ready when the pause ends for the retry, refilling from there
+        self._tokens = 1.0
+        self._updated = self._paused_until
+
+
+@dataclass
+class _Pending:
+    factory: Callable[[], Awaitable[Any]]
+    key: Optional[Hashable] = None
+    task: Optional[asyncio.Task] = None
+    waiters: int = 0
+
+
+class RequestScheduler:
+    """
+    Every Web API call goes through here. Calls wait for a token from the bucket, a 429 pauses
+    the bucket for the Retry-After Spotify sent and the call is retried. Calls submitted with a
+    coalesce key replace a queued call with the same key that has not been sent yet, so five
+    queued volume changes turn into a single request with the last level.
+    Calls are sent from their own task, so a caller that gives up does not take the request
+    away from callers coalesced into it; it is only cancelled once every caller gave up.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, max_retries: int = 3):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.sent = 0
+        self.coalesced = 0
+        self.throttled = 0
+        self._pending: Dict[Hashable, _Pending] = {}
+
+    async def submit(self, factory: Callable[[], Awaitable[Any]], key: Optional[Hashable] = None):
+        """Run the call made by `factory` once the rate limit allows."""
+        pending = self._pending.get(key) if key is not None else None
+        if pending:
+            # Not sent yet, swap in the newer call and share its outcome
+            pending.factory = factory
+            self.coalesced += 1
+            logger.info(f"🧺 Coalesced queued {key[0] if isinstance(key, tuple) else key} request")
+        else:
+            pending = _Pending(factory, key)
+            if key is not None:
+                self._pending[key] = pending
+            pending.task = asyncio.get_running_loop().create_task(self._run(pending))
+            # Whoever else awaits it retrieves the outcome, don't warn when nobody did
+            pending.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        pending.waiters += 1
+        try:
+            return await asyncio.shield(pending.task)
+        except asyncio.CancelledError:
+            pending.waiters -= 1
+            if pending.waiters == 0:
+                self._unqueue(pending)
+                pending.task.cancel()
+            raise
+
+    def _unqueue(self, pending: _Pending):
+        # Later calls with the key queue anew instead of joining this one
+        if pending.key is not None and self._pending.get(pending.key) is pending:
+            del self._pending[pending.key]
+
+    async def _run(self, pending: _Pending):
+        try:
+            await self.bucket.acquire()
+        finally:
+            self._unqueue(pending)
+        return await self._send(pending.factory)
+
+    async def _send(self, factory: Callable[[], Awaitable[Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sent += 1
+                return await factory()
+            except SpotifyException as e:
+                if e.http_status != 429 or attempt == self.max_retries:
+                    raise
+
+                retry_after = float((e.headers or {}).get('Retry-After', 1))
+                self.throttled += 1
+                logger.warning(f"⏳ Rate limited by Spotify, retrying in {retry_after:.0f}s")
+                self.bucket.pause(retry_after)
+                await self.bucket.acquire()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "throttled": self.throttled,
+        }
@@ -0,0 +1,139 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from matcher import FuzzyMatcher, normalize
+
+logger = logging.getLogger("spotify-service")
+
+# Track dict fields lookup() can match on
+TRACK_FIELDS = ('name', 'artist', 'album')
+
+
+class SearchCache:
+    """
+    Query -> track LRU for PlaySong, with a TTL and hit/miss counters.
+    Keys are normalized queries, so "Bohemian Rhapsody!" and "bohemian rhapsody" share an entry,
+    and near misses fall back to fuzzy matching against the cached queries. Track names are
+    deliberately not matched: "hello goodbye" must not be answered with a cached "Hello".
+    Lookups by track name, artist or album go through lookup(), which has its own matchers
+    and does not count towards the hit rate. The entries are written to disk on every change so they survive restarts.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 512, ttl: float = 7 * 24 * 3600, min_score: float = 0.85):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_score = min_score
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # Matchers over the cached queries and per track field, rebuilt lazily after a change
+        self._query_matcher: Optional[FuzzyMatcher[str]] = None
+        self._field_matchers: Dict[str, FuzzyMatcher[str]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            now = time.time()
+            for key, expires_at, track in data.get('entries', []):
+                if expires_at > now:
+                    self._entries[key] = (expires_at, track)
+            logger.info(f"🗂️ Loaded {len(self._entries)} cached searches from {self.path}")
+        except Exception:
+            logger.warning(f"Could not read search cache {self.path}, starting empty", exc_info=True)
+
+    def _save(self):
+        # Called with the lock held, entries are small and only written on a miss
+        entries = [[key, expires_at, track] for key, (expires_at, track) in self._entries.items()]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump({'entries': entries}, f)
+            tmp.replace(self.path)
+        except Exception:
+            logger.warning(f"Could not write search cache {self.path}", exc_info=True)
+
+    def _matcher(self) -> FuzzyMatcher[str]:
+        if self._query_matcher is None:
+            self._query_matcher = FuzzyMatcher([(key, key) for key in self._entries])
+        return self._query_matcher
+
+    def _field_matcher(self, field: str) -> FuzzyMatcher[str]:
+        matcher = self._field_matchers.get(field)
+        if matcher is None:
+            candidates = [(track.get(field, ''), key) for key, (_, track) in self._entries.items()]
+            matcher = self._field_matchers[field] = FuzzyMatcher(candidates)
+        return matcher
+
+    def _invalidate_matchers(self):
+        self._query_matcher = None
+        self._field_matchers.clear()
+
+    def _find(self, query: str) -> Optional[str]:
+        """Key of the live entry for the query, or for the closest cached query. Called with the lock held."""
+        key = normalize(query)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                return key
+            del self._entries[key]
+            self._invalidate_matchers()
+
+        match = self._matcher().extract_one(query, min_score=self.min_score)
+        if match and self._entries[match[0]][0] > time.time():
+            return match[0]
+        return None
+
+    def get(self, query: str) -> Optional[dict]:
+        with self._lock:
+            key = self._find(query)
+            if key is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][1]
+
+    def lookup(self, query: str, field: str = 'name', min_score: Optional[float] = None) -> Optional[dict]:
+        """Cached track whose name, artist or album best matches the query. Not counted in the hit rate."""
+        if field not in TRACK_FIELDS:
+            raise ValueError(f"Unknown track field {field!r}, expected one of {TRACK_FIELDS}")
+
+        with self._lock:
+            min_score = self.min_score if min_score is None else min_score
+            match = self._field_matcher(field).extract_one(query, min_score=min_score)
+            if match and self._entries[match[0]][0] > time.time():
+                return self._entries[match[0]][1]
+            return None
+
+    def put(self, query: str, track: dict):
+        with self._lock:
+            key = normalize(query)
+            self._entries[key] = (time.time() + self.ttl, track)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._invalidate_matchers()
+            self._save()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,15 +1,22 @@
+import asyncio
 import os
 import grpc
 import logging
-from concurrent import futures
+import time
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
-from fuzzywuzzy import fuzz
 from pathlib import Path
-import json
 
 import generated.spotify_pb2 as spotify_pb2
 import generated.spotify_pb2_grpc as spotify_pb2_grpc
+from auth import TokenManager
+from client import AsyncSpotify
+from controls import ControlDebouncer
+from devices import DeviceCache, is_device_error
+from playback import PlaybackMirror, track_from
+from playlists import PlaylistIndex
+from scheduler import RequestScheduler
+from search_cache import SearchCache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,10 +34,52 @@ logging.basicConfig(
 
 logger = logging.getLogger("spotify-service")
 
+# Seconds since the last playlist sync before a miss triggers another one
+PLAYLIST_RESYNC_AFTER = float(os.getenv('PLAYLIST_RESYNC_AFTER', 30))
+
+async def timed(timings, stage, awaitable):
+    """Await `awaitable`, recording how long it took under `stage` in ms"""
+    start = time.monotonic()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = (time.monotonic() - start) * 1000
+
+
+def log_timings(rpc, timings, start):
+    stages = ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in timings.items())
+    logger.info(f"⏱️ {rpc}: {stages}, total {(time.monotonic() - start) * 1000:.0f} ms")
+
+
 class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
+    """Served from a grpc.aio server: every handler is a coroutine and Spotify is called
+    through the async client, so a slow playback call no longer blocks other RPCs."""
+
     def __init__(self):
         self.sp = None
         self.sp_oauth = None
+        self.auth = None
+        self.devices = DeviceCache(self._fetch_devices, ttl=float(os.getenv('DEVICE_CACHE_TTL', 30)))
+        self.playlists = PlaylistIndex(
+            lambda limit, offset: self.sp.current_user_playlists(limit=limit, offset=offset),
+            Path('/app/data/playlists.json'),
+            sync_interval=float(os.getenv('PLAYLIST_SYNC_INTERVAL', 300))
+        )
+        self.searches = SearchCache(
+            Path('/app/data/search_cache.json'),
+            max_entries=int(os.getenv('SEARCH_CACHE_SIZE', 512)),
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', 7 * 24 * 3600)),
+            min_score=float(os.getenv('SEARCH_CACHE_MIN_SCORE', 0.85))
+        )
+        self.playback = PlaybackMirror(
+            lambda: self.sp.current_playback(),
+            active_interval=float(os.getenv('PLAYBACK_POLL_INTERVAL', 15)),
+            idle_interval=float(os.getenv('PLAYBACK_IDLE_POLL_INTERVAL', 60))
+        )
+        # Control commands arriving close together are merged into their net effect per device
+        self.controls = ControlDebouncer(self._send_control, window=float(os.getenv('CONTROL_DEBOUNCE_MS', 100)) / 1000)
+        # Playlist sync and playback polling loops, cancelled in close()
+        self._tasks = []
         self._init_spotify()
 
     def _init_spotify(self):
@@ -43,32 +92,16 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 scope="user-read-playback-state,user-modify-playback-state,user-read-currently-playing"
             )
 
-            # Try to load existing tokens
-            token_file = Path('/app/data/spotify_tokens.json')
-
-            if token_file.exists():
-                with open(token_file, 'r') as f:
-                    token_info = json.load(f)
-
-                # Check if token needs refresh
-                if self.sp_oauth.is_token_expired(token_info):
-                    logger.info("Refreshing Spotify access token...")
-                    token_info = self.sp_oauth.refresh_access_token(token_info['refresh_token'])
-
-                    # Save refreshed token
-                    with open(token_file, 'w') as f:
-                        json.dump(token_info, f, indent=2)
+            # Try to load existing tokens, refreshed ahead of expiry from here on
+            self.auth = TokenManager(
+                self.sp_oauth,
+                Path('/app/data/spotify_tokens.json'),
+                on_refresh=self._set_token,
+                refresh_margin=float(os.getenv('TOKEN_REFRESH_MARGIN', 120))
+            )
 
-                self.sp = spotipy.Spotify(auth=token_info['access_token'])
+            if self.auth.load():
                 logger.info("✅ Spotify client initialized successfully")
-
-                # Test connection
-                try:
-                    user = self.sp.current_user()
-                    logger.info(f"👤 Authenticated as: {user.get('display_name', 'Unknown')}")
-                except Exception as e:
-                    logger.error(f"Could not fetch user info: {e}")
-
             else:
                 logger.error("❌ No Spotify tokens found. Please run authentication first.")
                 logger.error("💡 Run: python scripts/spotify_auth.py")
@@ -76,75 +109,149 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
         except Exception as e:
             print(f"Failed to initialize Spotify: {e}")
 
-    def _ensure_authenticated(self):
-        """Ensure Spotify client is authenticated and refresh if needed"""
+    async def start(self):
+        """Runs once the event loop is up: checks the connection and starts the playlist sync"""
+        if not self.sp:
+            return
+
+        # Test connection
+        try:
+            user = await self.sp.current_user()
+            logger.info(f"👤 Authenticated as: {user.get('display_name', 'Unknown')}")
+        except Exception as e:
+            logger.error(f"Could not fetch user info: {e}")
+
+        self._tasks = [self.playlists.start(), self.playback.start()]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self.auth:
+            self.auth.stop()
+        if self.sp:
+            await self.sp.close()
+
+    def _set_token(self, token_info):
+        # Also called from the token refresh timer thread, swapping the header value is safe from there
+        if self.sp:
+            self.sp.set_auth(token_info['access_token'])
+        else:
+            self.sp = AsyncSpotify(
+                auth=token_info['access_token'],
+                scheduler=RequestScheduler(
+                    rate=float(os.getenv('SPOTIFY_RATE_LIMIT', 10)),
+                    burst=int(os.getenv('SPOTIFY_RATE_BURST', 20))
+                ),
+                max_connections=int(os.getenv('SPOTIFY_HTTP_CONNECTIONS', 10)),
+                on_unauthorized=self._reauthenticate
+            )
+
+    async def _ensure_authenticated(self):
+        """Ensure Spotify client is authenticated, refreshing the token if it has expired"""
         if not self.sp:
             return False
 
         try:
-            # Test with a simple API call
-            self.sp.current_user()
+            # Local expiry check only, the background timer normally refreshes well before this
+            if self.auth.expired():
+                await asyncio.to_thread(self.auth.refresh)
             return True
-        except spotipy.SpotifyException as e:
-            if e.http_status == 401:  # Unauthorized
-                self._init_spotify()
-                return self.sp is not None
-        except Exception:
-            pass
+        except Exception as e:
+            logger.error(f"Could not refresh Spotify token: {e}")
 
         return False
 
-    def _get_active_device(self):
-        """
-        Returns the active device dict, or the first device if none are active.
-        Returns None if no devices are found.
-        """
+    async def _reauthenticate(self):
+        """The token was rejected although it had not expired yet, refresh it so the call can be retried"""
         try:
-            devices_response = self.sp.devices()
-            devices = devices_response.get('devices', [])
-
-            if not devices:
-                logger.warning("No active Spotify devices found")
-                return None
-
-            for device in devices:
-                if device.get('is_active'):
-                    return device
+            await asyncio.to_thread(self.auth.refresh)
+        except Exception as e:
+            logger.error(f"Could not refresh Spotify token: {e}")
 
-            # No active device, fallback to first one
-            return devices[0]
+    async def _fetch_devices(self):
+        devices_response = await self.sp.devices()
+        return devices_response.get('devices', [])
 
-        except Exception as e:
-            logger.error("Failed to fetch Spotify devices", exc_info=True)
+    async def _get_active_device(self):
+        """
+        Returns the active device dict, or the first device if none are active.
+        Returns None if no devices are found. Served from the device cache.
+        """
+        return await self.devices.active()
+
+    async def _send_control(self, device_id, action, value):
+        if action == "pause":
+            result = await self.sp.pause_playback(device_id=device_id)
+        elif action == "play":
+            result = await self.sp.start_playback(device_id=device_id)
+        elif action == "next":
+            result = await self.sp.next_track(device_id=device_id)
+        elif action == "shuffle":
+            result = await self.sp.shuffle(value, device_id=device_id)
+        elif action == "volume":
+            result = await self.sp.volume(value, device_id=device_id)
+        else:
+            raise ValueError(f"Unknown control action: {action}")
+
+        self.playback.apply(action, value)
+        return result
+
+    async def _find_track(self, name):
+        """Track dict for a song name, or None. Repeat requests are answered from the search cache."""
+        track = self.searches.get(name)
+        if track:
+            stats = self.searches.stats()
+            logger.info(f"🗂️ Search cache hit ({stats['hit_rate']:.0%} hit rate)")
+            return track
+
+        search_results = await self.sp.search(q=name, type='track', limit=1)
+        if not search_results['tracks']['items']:
             return None
 
-
-    def PlaySong(self, request, context):
-        if not self._ensure_authenticated():
+        item = search_results['tracks']['items'][0]
+        track = track_from(item)
+        self.searches.put(name, track)
+        return track
+
+    async def _find_playlist(self, name):
+        """Playlist from the local index; a miss syncs once in case the playlist is new"""
+        playlist = self.playlists.search(name)
+        if not playlist and time.monotonic() - self.playlists.synced_at > PLAYLIST_RESYNC_AFTER:
+            await self.playlists.sync()
+            playlist = self.playlists.search(name)
+        return playlist
+
+    async def PlaySong(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
             )
 
+        start, timings = time.monotonic(), {}
+
         try:
             logger.info(f"🔍 Searching for: {request.name}")
 
-            # Search for the track
-            search_results = self.sp.search(q=request.name, type='track', limit=1)
+            # The search and the device lookup don't depend on each other, run them together
+            track, active_device = await asyncio.gather(
+                timed(timings, "search", self._find_track(request.name)),
+                timed(timings, "device", self._get_active_device())
+            )
 
-            if not search_results['tracks']['items']:
+            if not track:
                 return spotify_pb2.SpotifyResponse(
                     response=f"🚫 Song '{request.name}' not found",
                     success=False
                 )
 
-            track = search_results['tracks']['items'][0]
             track_uri = track['uri']
             track_name = track['name']
-            artist_name = track['artists'][0]['name']
+            artist_name = track['artist']
 
-            # Get available devices
-            active_device = self._get_active_device()
             if not active_device:
                 return spotify_pb2.SpotifyResponse(
                     response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -155,7 +262,9 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             device_name = active_device['name']
 
             # Start playback
-            self.sp.start_playback(uris=[track_uri], device_id=device_id)
+            await timed(timings, "playback", self.sp.start_playback(uris=[track_uri], device_id=device_id))
+            self.playback.apply("track", track, device=active_device)
+            log_timings("PlaySong", timings, start)
 
             response_msg = f"Playing '{track_name}' by {artist_name} on {device_name}"
             logger.info(response_msg)
@@ -166,6 +275,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -180,44 +291,29 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def PlayPlaylist(self, request, context):
-        if not self._ensure_authenticated():
+    async def PlayPlaylist(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
             )
 
+        start, timings = time.monotonic(), {}
+
         try:
 
             playlist_name = request.name
 
             logger.info(f"🔍 Searching for playlist: {playlist_name}")
 
-            # Fetch user playlists
-            playlists = self.sp.current_user_playlists()
-
-            max_similarity = 0
-            best_playlist = None
-
-            for playlist in playlists.get('items', []):
-                similarity = fuzz.ratio(playlist_name.lower(), playlist['name'].lower())
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_playlist = playlist
+            best_playlist, active_device = await asyncio.gather(
+                timed(timings, "search", self._find_playlist(playlist_name)),
+                timed(timings, "device", self._get_active_device())
+            )
 
             if best_playlist:
                 playlist_uri = best_playlist['uri']
 
-                devices_response = self.sp.devices()
-                devices = devices_response.get('devices', [])
-
-                if not devices:
-                    return spotify_pb2.SpotifyResponse(
-                        response="No active Spotify devices found. Please open Spotify on a device first.",
-                        success=False
-                    )
-
-                active_device = self._get_active_device()
                 if not active_device:
                     return spotify_pb2.SpotifyResponse(
                         response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -229,15 +325,17 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
 
 
                 # Start playing from the last song in the playlist
-                playlist_id = best_playlist['id']
-                playlist_tracks = self.sp.playlist_tracks(playlist_id)
-                total_tracks = playlist_tracks['total']
+                total_tracks = best_playlist['tracks_total']
                 last_song_offset = total_tracks - 5
                 offset = {"position": last_song_offset}
 
 
                 logger.info(f"Now playing {playlist_name}, starting on offset {offset['position']}")
-                self.sp.start_playback(device_id=device_id, context_uri=playlist_uri, offset=offset, position_ms=0)
+                await timed(timings, "playback", self.sp.start_playback(
+                    device_id=device_id, context_uri=playlist_uri, offset=offset, position_ms=0
+                ))
+                self.playback.apply("playlist", device=active_device)
+                log_timings("PlayPlaylist", timings, start)
 
                 playlist_correct_name = best_playlist.get('name', playlist_name)
                 response_msg = f"🎵 Playing playlist '{playlist_correct_name}' on {device_name}"
@@ -255,6 +353,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -269,8 +369,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def Stop(self, request, context):
-        if not self._ensure_authenticated():
+    async def Stop(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
@@ -278,7 +378,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
 
         try:
             logger.info(f"Starting to pause...")
-            active_device = self._get_active_device()
+            active_device = await self._get_active_device()
             if not active_device:
                 return spotify_pb2.SpotifyResponse(
                     response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -288,7 +388,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             device_id = active_device['id']
             device_name = active_device['name']
 
-            self.sp.pause_playback(device_id=device_id)
+            await self.controls.submit(device_id, "pause")
 
             success_msg = f"Successfully paused spotify on device on {device_name}"
             logger.info(success_msg)
@@ -299,6 +399,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -313,8 +415,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def Unpause(self, request, context):
-        if not self._ensure_authenticated():
+    async def Unpause(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
@@ -322,7 +424,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
 
         try:
             logger.info(f"Resuming playback...")
-            active_device = self._get_active_device()
+            active_device = await self._get_active_device()
             if not active_device:
                 return spotify_pb2.SpotifyResponse(
                     response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -332,7 +434,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             device_id = active_device['id']
             device_name = active_device['name']
 
-            self.sp.start_playback(device_id=device_id)
+            await self.controls.submit(device_id, "play")
 
             success_msg = f"Successfully resuming playback spotify on device on {device_name}"
             logger.info(success_msg)
@@ -343,6 +445,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -357,8 +461,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def Next(self, request, context):
-        if not self._ensure_authenticated():
+    async def Next(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
@@ -366,7 +470,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
 
         try:
             logger.info(f"Skipping song...")
-            active_device = self._get_active_device()
+            active_device = await self._get_active_device()
             if not active_device:
                 return spotify_pb2.SpotifyResponse(
                     response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -376,7 +480,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             device_id = active_device['id']
             device_name = active_device['name']
 
-            self.sp.next_track(device_id=device_id)
+            await self.controls.submit(device_id, "next")
 
             success_msg = f"Successfully skipped spotify on device on {device_name}"
             logger.info(success_msg)
@@ -387,6 +491,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -401,8 +507,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def ToggleShuffle(self, request, context):
-        if not self._ensure_authenticated():
+    async def ToggleShuffle(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
@@ -410,7 +516,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
 
         try:
             logger.info(f"Skipping song...")
-            active_device = self._get_active_device()
+            active_device = await self._get_active_device()
             if not active_device:
                 return spotify_pb2.SpotifyResponse(
                     response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -420,7 +526,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             device_id = active_device['id']
             device_name = active_device['name']
 
-            self.sp.shuffle(True, device_id=device_id)
+            await self.controls.submit(device_id, "shuffle", True)
 
             success_msg = f"Successfully toggled shuffle spotify on device on {device_name}"
             logger.info(success_msg)
@@ -431,6 +537,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -445,8 +553,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def SetVolume(self, request, context):
-        if not self._ensure_authenticated():
+    async def SetVolume(self, request, context):
+        if not await self._ensure_authenticated():
             return spotify_pb2.SpotifyResponse(
                 response="❌ Spotify not authenticated. Please check logs.",
                 success=False
@@ -457,7 +565,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
 
             volume = request.level
 
-            active_device = self._get_active_device()
+            active_device = await self._get_active_device()
             if not active_device:
                 return spotify_pb2.SpotifyResponse(
                     response="No active Spotify devices found. Please open Spotify on a device first.",
@@ -467,7 +575,7 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             device_id = active_device['id']
             device_name = active_device['name']
 
-            self.sp.volume(volume, device_id=device_id)
+            await self.controls.submit(device_id, "volume", volume)
 
             success_msg = f"Successfully set volume to {volume} on device on {device_name}"
             logger.info(success_msg)
@@ -478,6 +586,8 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
         except spotipy.SpotifyException as e:
+            if is_device_error(e):
+                self.devices.invalidate()
             error_msg = f"Spotify API error: {e.reason if hasattr(e, 'reason') else str(e)}"
             logger.error(error_msg)
             return spotify_pb2.SpotifyResponse(
@@ -492,11 +602,42 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
                 success=False
             )
 
-    def HealthCheck(self, request, context):
+    async def GetNowPlaying(self, request, context):
+        state = self.playback.state
+
+        if not state.track:
+            return spotify_pb2.NowPlayingResponse(response="Nothing is playing right now", success=True)
+
+        verb = "Playing" if state.is_playing else "Paused"
+        return spotify_pb2.NowPlayingResponse(
+            response=f"{verb} '{state.track['name']}' by {state.track['artist']}",
+            success=True,
+            is_playing=state.is_playing,
+            track=spotify_pb2.Track(**state.track),
+            progress_ms=state.progress_now()
+        )
+
+    async def GetState(self, request, context):
+        state = self.playback.state
+
+        return spotify_pb2.PlaybackState(
+            is_playing=state.is_playing,
+            track=spotify_pb2.Track(**state.track) if state.track else None,
+            progress_ms=state.progress_now(),
+            device_id=state.device_id,
+            device_name=state.device_name,
+            volume=state.volume,
+            shuffle=state.shuffle,
+            age=time.monotonic() - state.confirmed_at if state.confirmed_at else 0.0
+        )
+
+    async def HealthCheck(self, request, context):
         try:
+            stats = self.searches.stats()
             return spotify_pb2.HealthResponse(
                 status="healthy",
-                message="Spotify service is running normally"
+                message=f"Spotify service is running normally "
+                        f"(search cache: {stats['entries']} entries, {stats['hit_rate']:.0%} hit rate)"
             )
         except Exception as e:
             return spotify_pb2.HealthResponse(
@@ -505,24 +646,33 @@ class SpotifyService(spotify_pb2_grpc.SpotifyServiceServicer):
             )
 
 
-def serve():
+async def serve():
 
     port = os.getenv('GRPC_PORT', '50051')
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=1))
+    # Accept the keepalive pings the core service sends on its idle channels
+    server = grpc.aio.server(options=[
+        ('grpc.keepalive_permit_without_calls', 1),
+        ('grpc.http2.min_recv_ping_interval_without_data_ms', 30_000),
+    ])
 
     spotify_service = SpotifyService()
     spotify_pb2_grpc.add_SpotifyServiceServicer_to_server(spotify_service, server)
 
     listen_addr = f'[::]:{port}'
     server.add_insecure_port(listen_addr)
-    server.start()
+    await server.start()
+    await spotify_service.start()
 
     try:
-        server.wait_for_termination()
-    except KeyboardInterrupt:
-        server.stop(0)
+        await server.wait_for_termination()
+    except asyncio.CancelledError:
+        await server.stop(0)
+        await spotify_service.close()
 
 
 if __name__ == '__main__':
-    serve()
\ No newline at end of file
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
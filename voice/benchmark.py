@@ -0,0 +1,180 @@
+"""Micro-benchmarks for the voice service.
+
+Usage: python benchmark.py [checks] [tts] [wake] [frames]
+
+"checks" asserts behaviour that has regressed before and runs first by default.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from synthesizers import synthesizers_from_env
+
+load_dotenv()
+
+PHRASES = (
+    "Yes sir?",
+    "Booting up!",
+    "Error processing command",
+    "Playing 'Bohemian Rhapsody' by Queen on Desk",
+    "Successfully set volume to 60 on device on Living Room",
+    "I couldn't find a playlist with that name. Your closest match is Chill Hits, "
+    "would you like me to play that one instead?",
+)
+
+
+def bench_tts(repeat: int = 3):
+    """Time to first audio chunk and to the full phrase, per backend, with no cache in front."""
+    from tts import PhraseCache
+
+    local, cloud = synthesizers_from_env(os.getenv('ELEVENLABS_API_KEY'))
+    backends = [synthesizer for synthesizer in (local, cloud) if synthesizer]
+
+    print(f"{'backend':>12} | {'chars':>5} | {'first chunk ms':>14} | {'total ms':>9}")
+    for synthesizer in backends:
+        for phrase in PHRASES:
+            first, total = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for i, _chunk in enumerate(synthesizer.stream(phrase)):
+                    if i == 0:
+                        first.append((time.perf_counter() - start) * 1000)
+                total.append((time.perf_counter() - start) * 1000)
+            print(f"{synthesizer.name:>12} | {len(phrase):>5} | {statistics.median(first):>14.1f} | "
+                  f"{statistics.median(total):>9.1f}")
+
+    # What a cached phrase costs instead, from memory and from disk
+    cache_dir = Path(tempfile.mkdtemp())
+    synthesizer = backends[0]
+    audio = synthesizer.synthesize(PHRASES[0])
+    PhraseCache(cache_dir).put(PHRASES[0], synthesizer.voice, synthesizer.model, audio)
+    for label in ("disk", "memory"):
+        cache = PhraseCache(cache_dir)
+        if label == "memory":
+            # First read loads it from disk into memory
+            cache.get(PHRASES[0], synthesizer.voice, synthesizer.model)
+        start = time.perf_counter()
+        cache.get(PHRASES[0], synthesizer.voice, synthesizer.model)
+        print(f"{'cache ' + label:>12} | {len(PHRASES[0]):>5} | {'':>14} | {(time.perf_counter() - start) * 1000:>9.3f}")
+
+
+def bench_wake(repeat: int = 5):
+    """Detection-to-ready: time from a wake word hit until the next frame can be scored,
+    rebuilding the model as before vs resetting the loaded one."""
+    import numpy as np
+    from openwakeword.model import Model
+
+    from wakeword import WAKE_MODEL_PATH, WakeWordDetector, load_model
+
+    frame = np.zeros(1280, dtype=np.int16)
+    detector = WakeWordDetector(threshold=0.7, model=load_model())
+    detector.detect(frame)
+
+    def reload():
+        Model(wakeword_model_paths=[WAKE_MODEL_PATH], inference_framework="onnx").predict(frame)
+
+    def reset():
+        detector.reset()
+        detector.detect(frame)
+
+    print(f"{'strategy':>10} | {'ms to ready':>11}")
+    for name, rearm in (("reload", reload), ("reset", reset)):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rearm()
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{name:>10} | {statistics.median(times):>11.2f}")
+
+
+def bench_frames(seconds: int = 60):
+    """Re-framing a minute of 512-sample recorder output into 1280-sample wake frames,
+    concatenating leftovers as before vs through the ring buffer adapter."""
+    import numpy as np
+
+    from frames import FrameAdapter, STT_FRAME_LENGTH, WAKE_FRAME_LENGTH
+
+    chunks = [[0] * STT_FRAME_LENGTH for _ in range(seconds * 16000 // STT_FRAME_LENGTH)]
+
+    def concatenate():
+        pending = np.zeros(0, dtype=np.int16)
+        for chunk in chunks:
+            pending = np.concatenate([pending, np.frombuffer(np.array(chunk, dtype=np.int16).tobytes(), dtype=np.int16)])
+            while len(pending) >= WAKE_FRAME_LENGTH:
+                _frame, pending = pending[:WAKE_FRAME_LENGTH], pending[WAKE_FRAME_LENGTH:]
+
+    def adapter():
+        frames = FrameAdapter()
+        frames.add_consumer("wake", WAKE_FRAME_LENGTH)
+        for chunk in chunks:
+            frames.write(chunk)
+            while frames.read("wake") is not None:
+                pass
+
+    print(f"{'strategy':>12} | {'ms per minute':>13}")
+    for name, run in (("concatenate", concatenate), ("ring buffer", adapter)):
+        start = time.perf_counter()
+        run()
+        print(f"{name:>12} | {(time.perf_counter() - start) * 1000:>13.1f}")
+
+
+def check_frames():
+    """Both consumers get the recorded samples back in order, across ring wrap-arounds,
+    and a consumer that falls a whole ring behind skips ahead instead of reading stale audio."""
+    import numpy as np
+
+    from frames import FrameAdapter
+
+    # 1000 is no multiple of 300 or 333, so writes and frames straddle the wrap point
+    samples = np.arange(50 * 300, dtype=np.int16)
+    frame_lengths = {"wake": 333, "stt": 300}
+    frames = FrameAdapter(capacity=1000)
+    for name, length in frame_lengths.items():
+        frames.add_consumer(name, length)
+    received = {name: [] for name in frame_lengths}
+    for start in range(0, len(samples), 300):
+        frames.write(list(samples[start:start + 300]))
+        for name, out in received.items():
+            while (frame := frames.read(name)) is not None:
+                assert frame.base is not None and not frame.flags.writeable
+                out.append(frame.copy())
+
+    for name, out in received.items():
+        got = np.concatenate(out)
+        assert np.array_equal(got, samples[:len(got)]), name
+        assert len(samples) - len(got) < frame_lengths[name], name
+
+    frames = FrameAdapter(capacity=1000)
+    frames.add_consumer("wake", 500)
+    for start in range(0, 3000, 300):
+        frames.write(list(samples[start:start + 300]))
+    assert frames.dropped == 2000
+    assert frames.read("wake")[0] == 2000
+    frames.skip("wake")
+    assert frames.read("wake") is None
+
+
+def run_checks():
+    for check in (check_frames,):
+        check()
+        print(f"{check.__name__}: ok")
+
+
+BENCHMARKS = {
+    "checks": run_checks,
+    "tts": bench_tts,
+    "wake": bench_wake,
+    "frames": bench_frames,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
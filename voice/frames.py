@@ -0,0 +1,73 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# openWakeWord scores 80 ms windows, Cheetah (and PvRecorder) work in 512-sample frames
+WAKE_FRAME_LENGTH = 1280
+STT_FRAME_LENGTH = 512
+
+
+class FrameAdapter:
+    """
+    Re-frames recorder output for consumers that each want their own frame length.
+
+    Samples go into a preallocated ring stored twice back to back (the mirror trick): every
+    sample is written at i and i + capacity, so any window of up to `capacity` samples is
+    one contiguous slice. Frames are handed out as read-only views into the ring, with no
+    per-frame concatenation or allocation. A view stays valid until the ring wraps around
+    onto it, so consume each frame before reading more audio.
+    """
+
+    def __init__(self, capacity: int = 10240):
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=np.int16)
+        self._written = 0
+        self._cursors: Dict[str, int] = {}
+        self._frame_lengths: Dict[str, int] = {}
+        self.dropped = 0
+
+    def add_consumer(self, name: str, frame_length: int):
+        if frame_length > self.capacity:
+            raise ValueError(f"Frame length {frame_length} exceeds ring capacity {self.capacity}")
+        self._frame_lengths[name] = frame_length
+        self._cursors[name] = self._written
+
+    def write(self, pcm: Sequence[int]):
+        n = len(pcm)
+        if n > self.capacity:
+            raise ValueError(f"Cannot write {n} samples into a ring of {self.capacity}")
+
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            self._buffer[start:start + n] = pcm
+        else:
+            self._buffer[start:self.capacity] = pcm[:first]
+            self._buffer[:n - first] = pcm[first:]
+            self._buffer[self.capacity:self.capacity + n - first] = self._buffer[:n - first]
+        # Mirror from the ring itself, PvRecorder hands out lists and converting one twice is slow
+        self._buffer[start + self.capacity:start + self.capacity + first] = self._buffer[start:start + first]
+        self._written += n
+
+        # A consumer that fell a whole ring behind loses its oldest audio
+        oldest = self._written - self.capacity
+        for name, cursor in self._cursors.items():
+            if cursor < oldest:
+                self.dropped += oldest - cursor
+                self._cursors[name] = oldest
+
+    def read(self, name: str) -> Optional[np.ndarray]:
+        """The consumer's next frame as a read-only view, or None until enough audio arrived."""
+        cursor, frame_length = self._cursors[name], self._frame_lengths[name]
+        if self._written - cursor < frame_length:
+            return None
+
+        start = cursor % self.capacity
+        frame = self._buffer[start:start + frame_length]
+        frame.flags.writeable = False
+        self._cursors[name] = cursor + frame_length
+        return frame
+
+    def skip(self, name: str):
+        """Drop whatever the consumer has not read yet, e.g. audio heard while it was paused."""
+        self._cursors[name] = self._written
@@ -5,18 +5,14 @@ from concurrent import futures
 import os
 from concurrent import futures
 from dotenv import load_dotenv
-from elevenlabs import play
-from elevenlabs.client import ElevenLabs
 from pvrecorder import PvRecorder
 import pvporcupine
 import pvcheetah
 import threading
 
-import openwakeword
-
-from openwakeword.model import Model
-import numpy as np
-
+from frames import FrameAdapter, STT_FRAME_LENGTH
+from tts import Speaker
+from wakeword import WakeWordDetector
 import generated.voice_pb2 as voice_pb2
 import generated.voice_pb2_grpc as voice_pb2_grpc
 
@@ -44,13 +40,20 @@ class VoiceService(voice_pb2_grpc.VoiceServiceServicer):
         eleven_labs_key = os.getenv('ELEVENLABS_API_KEY')
         cheetah_key = os.getenv('PVCHEETAH_API_KEY')
 
-        if not eleven_labs_key or not cheetah_key:
+        # ElevenLabs is optional, replies are spoken by the local engine without it
+        if not cheetah_key:
             raise ValueError("Necessary API keys not found in environment variables")
 
-        self.elevenlabs_client = ElevenLabs(api_key=eleven_labs_key)
-        self.recorder = PvRecorder(device_index=-1, frame_length=512)
+        self.speaker = Speaker.from_env(eleven_labs_key)
+        self.speaker.prewarm()
+        self.recorder = PvRecorder(device_index=-1, frame_length=STT_FRAME_LENGTH)
         self.cheetah = pvcheetah.create(access_key=cheetah_key, endpoint_duration_sec=1.5)
-        self.wake_model = Model(wakeword_model_paths=["Resources/hey_jarvis_v0.1.onnx"])
+        self.wake_detector = WakeWordDetector(self.THRESHOLD)
+
+        # The wake word model scores 80 ms windows, Cheetah takes the recorder's 512-sample frames
+        self.frames = FrameAdapter()
+        self.frames.add_consumer("wake", self.frame_samples)
+        self.frames.add_consumer("stt", self.cheetah.frame_length)
 
         # Start wake word detection
         self._start_wake_word_detection()
@@ -67,32 +70,15 @@ class VoiceService(voice_pb2_grpc.VoiceServiceServicer):
         )
 
     def _do_tts(self, text):
+        return self.speaker.speak(text)
 
-        print(f"Speaking: {text}")
-
-        voice = os.getenv('ELEVEN_VOICE_ID')
-        if not voice:
-            raise ValueError("ELEVEN_VOICE_ID not found in environment variables")
-
-        model = os.getenv('ELEVEN_MODEL')
-        if not model:
-            raise ValueError("ELEVEN_MODEL not found in environment variables")
-
-        audio = self.elevenlabs_client.generate(
-            text=text,
-            voice=voice,
-            model=model
-        )
-
-        if not audio:
-            raise ValueError("Failed to generate audio")
-
-        play(audio)
-
-        return True
-
-    def get_next_audio_frame(self):
-        return self.recorder.read()
+    def get_next_audio_frame(self, consumer="stt"):
+        """Next frame sized for `consumer`, reading from the recorder until one is complete"""
+        frame = self.frames.read(consumer)
+        while frame is None:
+            self.frames.write(self.recorder.read())
+            frame = self.frames.read(consumer)
+        return frame
 
     def _start_wake_word_detection(self):
         """ Start the background wake word detection thread """
@@ -115,19 +101,16 @@ class VoiceService(voice_pb2_grpc.VoiceServiceServicer):
 
             while not self._stop_wake_word.is_set():
                 try:
-                    # Get audio frame and check for wake word
-                    pcm = self.recorder.read()
-
-                    if isinstance(pcm, bytes):
-                        pcm = np.frombuffer(pcm, dtype=np.int16)
-
-                    prediction = self.wake_model.predict(pcm)
+                    # Get an 80 ms frame and check for wake word
+                    pcm = self.get_next_audio_frame("wake")
 
-                    for wakeword, score in prediction.items():
-                        if score >= self.THRESHOLD:
-                            print("Hello sir, how can I help you?")
-                            self._process_speech_recognition()
-                            break
+                    if self.wake_detector.detect(pcm):
+                        print("Hello sir, how can I help you?")
+                        self._process_speech_recognition()
+                        # Re-arm, the buffered audio still scores above the threshold
+                        self.wake_detector.reset()
+                        # Don't score what was said to Cheetah
+                        self.frames.skip("wake")
 
                 except Exception as e:
                     print(f"Error in wake word detection: {e}")
@@ -145,10 +128,11 @@ class VoiceService(voice_pb2_grpc.VoiceServiceServicer):
 
         result = ""
         start_time = time.time()
+        self.frames.skip("stt")
 
         try:
             while True:
-                pcm = self.get_next_audio_frame()
+                pcm = self.get_next_audio_frame("stt")
                 partial_transcript, is_endpoint = self.cheetah.process(pcm)
                 result += partial_transcript
 
@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Sequence
+
+
+class Synthesizer(ABC):
+    """
+    A text to speech backend. `voice` and `model` identify the sound it produces and are
+    part of the phrase cache key. Backends that can't stream yield all audio at once.
+    """
+
+    name = "synthesizer"
+    # Whether the output of consecutive synthesize calls can be played back to back as one stream
+    concatenable = False
+
+    def __init__(self, voice: str, model: str):
+        self.voice = voice
+        self.model = model
+
+    def stream(self, text: str) -> Iterator[bytes]:
+        yield self.synthesize(text)
+
+    @abstractmethod
+    def synthesize(self, text: str) -> bytes:
+        """All audio for the text at once."""
+
+
+class ElevenLabsSynthesizer(Synthesizer):
+    """Cloud voices, MP3 output streamed chunk by chunk as ElevenLabs produces it."""
+
+    name = "elevenlabs"
+    concatenable = True
+
+    def __init__(self, client, voice: str, model: str):
+        super().__init__(voice, model)
+        self.client = client
+
+    def stream(self, text: str) -> Iterator[bytes]:
+        for chunk in self.client.generate(text=text, voice=self.voice, model=self.model, stream=True):
+            if chunk:
+                yield chunk
+
+    def synthesize(self, text: str) -> bytes:
+        audio = self.client.generate(text=text, voice=self.voice, model=self.model)
+        # generate hands back a stream of chunks
+        return audio if isinstance(audio, bytes) else b"".join(audio)
+
+
+class EspeakSynthesizer(Synthesizer):
+    """Local espeak-ng on the CPU, WAV output. Robotic, but answers in tens of milliseconds with no network."""
+
+    name = "local"
+
+    def __init__(self, voice: str = "en", speed: int = 175, binary: str = "espeak-ng"):
+        super().__init__(f"espeak:{voice}", str(speed))
+        self.espeak_voice = voice
+        self.speed = speed
+        self.binary = binary
+
+    @classmethod
+    def available(cls, binary: str = "espeak-ng") -> bool:
+        return shutil.which(binary) is not None
+
+    def synthesize(self, text: str) -> bytes:
+        # Text goes in on stdin, as an argument a reply like "-5 degrees" would be read as an option
+        result = subprocess.run(
+            [self.binary, "--stdout", "--stdin", "-v", self.espeak_voice, "-s", str(self.speed)],
+            input=text.encode(), capture_output=True, check=True, timeout=10
+        )
+        return result.stdout
+
+
+class RoutingPolicy:
+    """
+    Picks the backend for an utterance. System phrases and short replies go to the local
+    engine when there is one, everything else to the cloud; TTS_BACKEND=local or
+    TTS_BACKEND=elevenlabs forces one backend.
+    """
+
+    def __init__(self, system_phrases: Sequence[str] = (), local_max_chars: int = 40, force: Optional[str] = None):
+        self.system_phrases = set(system_phrases)
+        self.local_max_chars = local_max_chars
+        self.force = force
+
+    def choose(self, text: str, local: Optional[Synthesizer], cloud: Optional[Synthesizer]) -> Synthesizer:
+        if self.force == "local" and local:
+            return local
+        if self.force == "elevenlabs" and cloud:
+            return cloud
+
+        if local and (not cloud or text in self.system_phrases or len(text) <= self.local_max_chars):
+            return local
+        return cloud
+
+
+def synthesizers_from_env(elevenlabs_key: Optional[str]):
+    """The (local, cloud) backends that can be set up from the environment, either may be None."""
+    local = None
+    if EspeakSynthesizer.available():
+        local = EspeakSynthesizer(
+            voice=os.getenv('ESPEAK_VOICE', 'en'),
+            speed=int(os.getenv('ESPEAK_SPEED', 175))
+        )
+
+    cloud = None
+    voice, model = os.getenv('ELEVEN_VOICE_ID'), os.getenv('ELEVEN_MODEL')
+    if elevenlabs_key and voice and model:
+        from elevenlabs.client import ElevenLabs
+
+        cloud = ElevenLabsSynthesizer(ElevenLabs(api_key=elevenlabs_key), voice, model)
+
+    if not local and not cloud:
+        raise ValueError("No TTS backend: set ELEVENLABS_API_KEY, ELEVEN_VOICE_ID and ELEVEN_MODEL, "
+                         "or install espeak-ng")
+    return local, cloud
@@ -0,0 +1,335 @@
+import hashlib
+import os
+import queue
+import re
+import subprocess
+import threading
+from collections import OrderedDict, deque
+from concurrent import futures
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from elevenlabs import play
+
+from synthesizers import RoutingPolicy, Synthesizer, synthesizers_from_env
+
+# Spoken on every boot, wake word and failure, worth having ready before they are needed
+PREWARM_PHRASES = (
+    "Booting up!",
+    "Yes sir?",
+    "Error processing command",
+    "Failed to retrieve response",
+)
+
+CACHE_DIR = Path(os.getenv('TTS_CACHE_DIR', 'Resources/.cache/tts'))
+
+# Play stdin as it arrives instead of waiting for the whole file
+FFPLAY = ["ffplay", "-autoexit", "-nodisp", "-loglevel", "quiet", "-"]
+
+
+def split_sentences(text: str, min_length: int = 24) -> List[str]:
+    """Split a response into sentences, merging fragments shorter than min_length into the next one."""
+    sentences, current = [], ""
+    for part in re.split(r'(?<=[.!?;:])\s+', text.strip()):
+        current = f"{current} {part}".strip()
+        if len(current) >= min_length:
+            sentences.append(current)
+            current = ""
+    if current:
+        if sentences and len(current) < min_length:
+            sentences[-1] = f"{sentences[-1]} {current}"
+        else:
+            sentences.append(current)
+    return sentences
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size byte ring between the synthesis and the player.
+    write blocks while the ring is full and read blocks while it is empty, so a slow player
+    holds back synthesis instead of letting audio pile up in memory.
+    """
+
+    def __init__(self, capacity: int = 256 * 1024):
+        self._buffer = bytearray(capacity)
+        self.capacity = capacity
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            with self._cond:
+                while self._size == self.capacity and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                end = (self._start + self._size) % self.capacity
+                n = min(len(view), self.capacity - self._size, self.capacity - end)
+                self._buffer[end:end + n] = view[:n]
+                self._size += n
+                self._cond.notify_all()
+            view = view[n:]
+
+    def read(self, max_bytes: int = 4096) -> bytes:
+        """Up to max_bytes, or b"" once the ring is closed and drained."""
+        with self._cond:
+            while self._size == 0 and not self._closed:
+                self._cond.wait()
+
+            n = min(max_bytes, self._size, self.capacity - self._start)
+            data = bytes(self._buffer[self._start:self._start + n])
+            self._start = (self._start + n) % self.capacity
+            self._size -= n
+            self._cond.notify_all()
+            return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class PhraseCache:
+    """
+    Synthesized audio keyed by (text, voice, model), in memory and on disk.
+    Files are named by the hash of the key, so the same phrase is never stored twice; the
+    least recently used ones are evicted once the directory grows past max_disk_bytes.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, max_disk_bytes: int = 50 * 1024 * 1024,
+                 max_memory_entries: int = 64):
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(f"{voice}\0{model}\0{text}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.audio"
+
+    def _remember(self, key: str, audio: bytes):
+        self._memory[key] = audio
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, text: str, voice: str, model: str) -> Optional[bytes]:
+        key = self.key(text, voice, model)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+            path = self._path(key)
+            try:
+                audio = path.read_bytes()
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+
+            # Touch the file, eviction goes by modification time
+            path.touch()
+            self._remember(key, audio)
+            self.hits += 1
+            return audio
+
+    def put(self, text: str, voice: str, model: str, audio: bytes):
+        key = self.key(text, voice, model)
+        with self._lock:
+            self._remember(key, audio)
+            tmp = self._path(key).with_suffix('.tmp')
+            tmp.write_bytes(audio)
+            tmp.replace(self._path(key))
+            self._evict()
+
+    def _evict(self):
+        files = sorted(self.directory.glob('*.audio'), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+
+class Speaker:
+    """
+    Text to speech through the local or the cloud backend, as the routing policy decides,
+    served from the phrase cache whenever the text was spoken before.
+    """
+
+    def __init__(self, local: Optional[Synthesizer], cloud: Optional[Synthesizer],
+                 policy: Optional[RoutingPolicy] = None, cache: Optional[PhraseCache] = None):
+        self.local = local
+        self.cloud = cloud
+        self.policy = policy or RoutingPolicy(PREWARM_PHRASES)
+        self.cache = cache or PhraseCache(
+            max_disk_bytes=int(os.getenv('TTS_CACHE_MB', 50)) * 1024 * 1024
+        )
+
+    @classmethod
+    def from_env(cls, elevenlabs_key: Optional[str]) -> "Speaker":
+        local, cloud = synthesizers_from_env(elevenlabs_key)
+        policy = RoutingPolicy(
+            PREWARM_PHRASES,
+            local_max_chars=int(os.getenv('TTS_LOCAL_MAX_CHARS', 40)),
+            force=os.getenv('TTS_BACKEND')
+        )
+        return cls(local, cloud, policy)
+
+    def _route(self, text: str) -> Synthesizer:
+        return self.policy.choose(text, self.local, self.cloud)
+
+    def synthesize(self, text: str, synthesizer: Optional[Synthesizer] = None) -> bytes:
+        synthesizer = synthesizer or self._route(text)
+
+        audio = self.cache.get(text, synthesizer.voice, synthesizer.model)
+        if audio is not None:
+            return audio
+
+        audio = synthesizer.synthesize(text)
+        if not audio:
+            raise ValueError("Failed to generate audio")
+
+        self.cache.put(text, synthesizer.voice, synthesizer.model, audio)
+        return audio
+
+    def speak(self, text: str) -> bool:
+        synthesizer = self._route(text)
+        fallback = self.local if synthesizer is not self.local else None
+        print(f"Speaking ({synthesizer.name}): {text}")
+
+        audio = self.cache.get(text, synthesizer.voice, synthesizer.model)
+        if audio is None and synthesizer.concatenable:
+            # Falls back per sentence, only for what has not been played yet
+            return self.speak_streaming(text, synthesizer, fallback=fallback)
+
+        try:
+            play(audio if audio is not None else self.synthesize(text, synthesizer))
+            return True
+
+        except Exception as e:
+            if not fallback:
+                raise
+            # Say it in the local voice rather than not at all
+            print(f"{synthesizer.name} failed ({e}), falling back to {fallback.name}")
+            play(self.synthesize(text, fallback))
+            return True
+
+    def _stream_sentence(self, synthesizer: Synthesizer, sentence: str, chunks: "queue.Queue[Optional[bytes]]"):
+        """Synthesize one sentence, handing chunks over as they arrive and caching the result."""
+        try:
+            audio = self.cache.get(sentence, synthesizer.voice, synthesizer.model)
+            if audio is not None:
+                chunks.put(audio)
+                return
+
+            parts = []
+            for chunk in synthesizer.stream(sentence):
+                parts.append(chunk)
+                chunks.put(chunk)
+            self.cache.put(sentence, synthesizer.voice, synthesizer.model, b"".join(parts))
+        finally:
+            chunks.put(None)
+
+    def _sentence_audio(self, synthesizer: Synthesizer, sentences: List[str],
+                        lookahead: int) -> Iterator[Iterator[bytes]]:
+        """Audio of each sentence in order, as an iterator of its chunks. At most `lookahead`
+        sentences are synthesized ahead: the next one is submitted once one has been consumed."""
+        upcoming = iter(sentences)
+        pending: "deque[Tuple[futures.Future, queue.Queue]]" = deque()
+
+        with futures.ThreadPoolExecutor(max_workers=lookahead) as executor:
+            def submit():
+                sentence = next(upcoming, None)
+                if sentence is not None:
+                    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+                    pending.append((executor.submit(self._stream_sentence, synthesizer, sentence, chunks), chunks))
+
+            for _ in range(lookahead):
+                submit()
+
+            while pending:
+                future, chunks = pending.popleft()
+                yield self._drain(future, chunks)
+                submit()
+
+    @staticmethod
+    def _drain(future: futures.Future, chunks: "queue.Queue[Optional[bytes]]") -> Iterator[bytes]:
+        while (chunk := chunks.get()) is not None:
+            yield chunk
+        # Surface a synthesis error once its sentence is due
+        future.result()
+
+    def speak_streaming(self, text: str, synthesizer: Optional[Synthesizer] = None, lookahead: int = 2,
+                        fallback: Optional[Synthesizer] = None) -> bool:
+        """Start playing the first sentence while the rest is still being synthesized.
+        If synthesis fails partway, the sentences not fully played yet are said by `fallback`."""
+        synthesizer = synthesizer or self._route(text)
+        sentences = split_sentences(text)
+        ring = AudioRingBuffer()
+        player = subprocess.Popen(FFPLAY, stdin=subprocess.PIPE)
+
+        def feed_player():
+            try:
+                while data := ring.read():
+                    player.stdin.write(data)
+                player.stdin.close()
+            except (BrokenPipeError, OSError):
+                ring.close()
+
+        feeder = threading.Thread(target=feed_player, name="tts-player", daemon=True)
+        feeder.start()
+
+        # Sentences written to the ring in full
+        done = 0
+        error = None
+        try:
+            for audio in self._sentence_audio(synthesizer, sentences, lookahead):
+                for chunk in audio:
+                    ring.write(chunk)
+                done += 1
+        except Exception as e:
+            if not fallback:
+                raise
+            error = e
+        finally:
+            ring.close()
+            feeder.join()
+            player.wait()
+
+        if error is not None:
+            # A sentence cut off midway is said again in full
+            print(f"{synthesizer.name} failed ({error}), falling back to {fallback.name} "
+                  f"for {len(sentences) - done} of {len(sentences)} sentences")
+            play(self.synthesize(" ".join(sentences[done:]), fallback))
+        elif not done:
+            raise ValueError("Failed to generate audio")
+        return True
+
+    def prewarm(self, phrases: Optional[Iterable[str]] = None):
+        """Load the phrases into memory, synthesizing the ones not on disk yet.
+        TTS_PREWARM_PHRASES adds to the defaults, separated by '|'."""
+        if phrases is None:
+            extra = [p.strip() for p in os.getenv('TTS_PREWARM_PHRASES', '').split('|') if p.strip()]
+            phrases = PREWARM_PHRASES + tuple(extra)
+
+        for phrase in phrases:
+            try:
+                self.synthesize(phrase)
+            except Exception as e:
+                print(f"Could not prewarm '{phrase}': {e}")
+        print(f"TTS cache ready ({self.cache.hits} phrases from disk, {self.cache.misses} synthesized)")
@@ -1,17 +1,17 @@
 import os
 import time
-import numpy as np
 
 from dotenv import load_dotenv
-from elevenlabs import play
-from elevenlabs.client import ElevenLabs
 from pvrecorder import PvRecorder
 import pvcheetah
-from openwakeword.model import Model
 import grpc
 import time
 import sys
 
+from frames import FrameAdapter, STT_FRAME_LENGTH, WAKE_FRAME_LENGTH
+from tts import Speaker
+from wakeword import WakeWordDetector
+
 load_dotenv()
 
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -36,13 +36,20 @@ class VoiceService:
         eleven_labs_key = os.getenv('ELEVENLABS_API_KEY')
         cheetah_key = os.getenv('PVCHEETAH_API_KEY')
 
-        if not eleven_labs_key or not cheetah_key:
+        # ElevenLabs is optional, replies are spoken by the local engine without it
+        if not cheetah_key:
             raise ValueError("Necessary API keys not found in environment variables")
 
-        self.elevenlabs_client = ElevenLabs(api_key=eleven_labs_key)
-        self.recorder = PvRecorder(device_index=-1, frame_length=512)
+        self.speaker = Speaker.from_env(eleven_labs_key)
+        self.speaker.prewarm()
+        self.recorder = PvRecorder(device_index=-1, frame_length=STT_FRAME_LENGTH)
         self.cheetah = pvcheetah.create(access_key=cheetah_key, endpoint_duration_sec=1.5)
-        self.wake_model = Model(wakeword_model_paths=["Resources/hey_jarvis_v0.1.onnx"])
+        self.wake_detector = WakeWordDetector(self.THRESHOLD)
+
+        # The wake word model scores 80 ms windows, Cheetah takes the recorder's 512-sample frames
+        self.frames = FrameAdapter()
+        self.frames.add_consumer("wake", WAKE_FRAME_LENGTH)
+        self.frames.add_consumer("stt", self.cheetah.frame_length)
 
     def connect_to_core(self):
         """Establish gRPC connection to Core service"""
@@ -88,32 +95,64 @@ class VoiceService:
                 return response.response
             else:
                 print(f"Error from Core: {response.error_message}")
-                return "Failed to retrieve response"
+                # Failed commands still carry a message worth saying ("Song not found")
+                return response.response or "Failed to retrieve response"
 
         except grpc.RpcError as e:
             print(f"gRPC error: {e}")
             return None
 
-    def _do_tts(self, text):
-        print(f"Speaking: {text}")
+    def stream_message(self, message):
+        """Send a message through the streaming RPC, speaking the acknowledgement while the command runs"""
+        if not self.stub:
+            print("❌ Not connected to Core service")
+            return None
+
+        try:
+
+            request = core_pb2.MessageRequest(
+                message=message,
+                source="voice",
+                timestamp=int(time.time())
+            )
 
-        voice = os.getenv('ELEVEN_VOICE_ID')
-        model = os.getenv('ELEVEN_MODEL')
+            print(f"Sending: '{message}'")
 
-        if not voice or not model:
-            raise ValueError("ELEVEN_VOICE_ID or ELEVEN_MODEL not found in environment variables")
+            for event in self.stub.ProcessMessageStream(request):
+                if event.type == core_pb2.MessageEvent.INTENT_RESOLVED:
+                    print(f"Intent resolved: {event.intent}")
+                    if event.acknowledgement:
+                        self._do_tts(event.acknowledgement)
+
+                elif event.type == core_pb2.MessageEvent.PROGRESS:
+                    print(f"{event.message} ({event.elapsed:.1f}s)")
+
+                elif event.type == core_pb2.MessageEvent.FINAL:
+                    response = event.response
+                    if response.success:
+                        print(f"Core responded: '{response.response}'")
+                        return response.response
+                    else:
+                        print(f"Error from Core: {response.error_message}")
+                        return response.response or "Failed to retrieve response"
+
+            print("Core closed the stream without a response")
+            return None
 
-        audio = self.elevenlabs_client.generate(
-            text=text,
-            voice=voice,
-            model=model
-        )
+        except grpc.RpcError as e:
+            print(f"gRPC error: {e}")
+            return None
 
-        if not audio:
-            raise ValueError("Failed to generate audio")
+    def _do_tts(self, text):
+        return self.speaker.speak(text)
 
-        play(audio)
-        return True
+    def _next_frame(self, consumer):
+        """Next frame sized for `consumer`, reading from the recorder until one is complete"""
+        frame = self.frames.read(consumer)
+        while frame is None:
+            self.frames.write(self.recorder.read())
+            frame = self.frames.read(consumer)
+        return frame
 
     def listen_for_wake_word(self):
         print("Starting wake word detection...")
@@ -122,24 +161,22 @@ class VoiceService:
 
         try:
             while True:
-                pcm = self.recorder.read()
-                if isinstance(pcm, bytes):
-                    pcm = np.frombuffer(pcm, dtype=np.int16)
-
-                prediction = self.wake_model.predict(pcm)
-
-                for wakeword, score in prediction.items():
-                    if score >= self.THRESHOLD:
-                        print(f"Score: {score}")
-                        print("Wake word detected!")
+                pcm = self._next_frame("wake")
+                detection = self.wake_detector.detect(pcm)
 
-                        self._process_speech_recognition()
+                if detection:
+                    wakeword, score = detection
+                    print(f"Score: {score}")
+                    print("Wake word detected!")
 
-                        print("Returning to wake word detection...")
+                    self._process_speech_recognition()
 
-                        self.wake_model = Model(wakeword_model_paths=["Resources/hey_jarvis_v0.1.onnx"])
+                    print("Returning to wake word detection...")
 
-                        break
+                    # Re-arm without reloading the model
+                    self.wake_detector.reset()
+                    # Don't score what was said to Cheetah
+                    self.frames.skip("wake")
 
         except KeyboardInterrupt:
             print("Stopping wake word detection.")
@@ -154,10 +191,11 @@ class VoiceService:
 
         if not self.recorder.is_recording:
             self.recorder.start()
+        self.frames.skip("stt")
 
         try:
             while True:
-                pcm = self.recorder.read()
+                pcm = self._next_frame("stt")
                 partial_transcript, is_endpoint = self.cheetah.process(pcm)
                 result += partial_transcript
 
@@ -184,7 +222,7 @@ class VoiceService:
 
     def _process_command(self, command_text):
 
-        return self.send_message(message=command_text)
+        return self.stream_message(message=command_text)
 
     def shutdown(self):
         if hasattr(self, 'recorder') and self.recorder.is_recording:
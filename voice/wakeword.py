@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from openwakeword.model import Model
+
+WAKE_MODEL_PATH = os.getenv('WAKE_MODEL_PATH', "Resources/hey_jarvis_v0.1.onnx")
+
+_models: Dict[str, Model] = {}
+_lock = threading.Lock()
+
+
+def load_model(path: str = WAKE_MODEL_PATH) -> Model:
+    """The openWakeWord model for `path`, loaded once per process.
+
+    Creating a Model reads the ONNX files and builds new inference sessions, which takes
+    seconds; everything in the process shares the one instance instead.
+    """
+    with _lock:
+        model = _models.get(path)
+        if model is None:
+            start = time.perf_counter()
+            # openWakeWord defaults to tflite where it is installed, our model is ONNX
+            model = _models[path] = Model(wakeword_model_paths=[path], inference_framework="onnx")
+            print(f"Wake word model loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return model
+
+
+class WakeWordDetector:
+    """Scores audio frames against the wake word model and is re-armed with reset() after a hit."""
+
+    def __init__(self, threshold: float, model: Optional[Model] = None):
+        self.threshold = threshold
+        self.model = model or load_model()
+
+    def detect(self, pcm: np.ndarray) -> Optional[Tuple[str, float]]:
+        """The (wake word, score) that crossed the threshold on this frame, if any."""
+        prediction = self.model.predict(pcm)
+        for wakeword, score in prediction.items():
+            if score >= self.threshold:
+                return wakeword, score
+        return None
+
+    def reset(self):
+        """Clear the streaming audio and score buffers so the last detection doesn't fire again.
+        Keeps the ONNX sessions, but is not free: openWakeWord refills its feature buffer by running
+        the melspectrogram and embedding models over 4 s of random audio, tens of milliseconds on a
+        desktop CPU versus seconds for a reload. `python benchmark.py wake` measures both."""
+        self.model.reset()